@@ -1,53 +1,113 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-import sqlite3
-from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response
+import functools
+import hashlib
 import os
 
+from core import (
+    ConnectionPool, parse_datetime, parse_timestamp,
+    relative_time_from_seconds, relative_time_since,
+)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
 # 数据库文件路径
 DATABASE = 'todo.db'
 
+# 连接池大小（池中保留的长连接数量）
+POOL_SIZE = 8
+pool = ConnectionPool(DATABASE, POOL_SIZE)
+get_conn = pool.connection
+
+# 优先级及其排序值，写入时在Python中换算好 priority_rank
+PRIORITY_RANK = {'high': 1, 'medium': 2, 'low': 3}
+VALID_PRIORITIES = frozenset(PRIORITY_RANK)
+
+# SQL语句统一定义为模块常量，文本保持不变以命中SQLite的语句缓存
+# 仅用于回填旧数据，与 PRIORITY_RANK 保持一致
+SQL_PRIORITY_RANK = "CASE priority WHEN 'high' THEN 1 WHEN 'low' THEN 3 ELSE 2 END"
+SQL_INSERT_TODO = "INSERT INTO todos (content, priority, priority_rank) VALUES (?, ?, ?)"
+# 排序完全由 idx_todos_completed_rank_created 索引提供，无需额外排序
+# 显示用的时间格式和经过秒数在SQL中算好，模板里不再逐行调用过滤器
+SQL_SELECT_TODOS = '''
+    SELECT id, content, completed, priority,
+           strftime('%Y年%m月%d日 %H:%M', created_at) AS created_fmt,
+           CAST((julianday('now') - julianday(created_at)) * 86400 AS INTEGER) AS created_age,
+           strftime('%Y年%m月%d日 %H:%M', completed_at) AS completed_fmt,
+           CAST((julianday('now') - julianday(completed_at)) * 86400 AS INTEGER) AS completed_age
+    FROM todos
+    ORDER BY completed ASC, priority_rank ASC, created_at ASC
+'''
+SQL_SELECT_TODO = "SELECT id, content, completed, priority, created_at, completed_at FROM todos WHERE id = ?"
+# 完成时间由SQLite直接写入，与 created_at 的默认值使用同一时钟
+SQL_COMPLETE = "UPDATE todos SET completed = 1, completed_at = CURRENT_TIMESTAMP WHERE id = ?"
+SQL_UNCOMPLETE = "UPDATE todos SET completed = 0, completed_at = NULL WHERE id = ?"
+SQL_DELETE = "DELETE FROM todos WHERE id = ?"
+SQL_UPDATE_TODO = "UPDATE todos SET content = ?, priority = ?, priority_rank = ? WHERE id = ?"
+SQL_STATS = "SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM todos"
+# 时间接口的变化签名：增删任务或完成状态变化都会改变结果；相对时间按分钟刷新
+SQL_TIMES_SIGNATURE = '''
+    SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(completed), 0),
+           COALESCE(MAX(completed_at), ''), strftime('%Y-%m-%d %H:%M', 'now')
+    FROM todos
+'''
+SQL_TIMES = '''
+    SELECT id,
+           strftime('%Y年%m月%d日 %H:%M', created_at),
+           CAST((julianday('now') - julianday(created_at)) * 86400 AS INTEGER),
+           strftime('%Y年%m月%d日 %H:%M', completed_at),
+           CAST((julianday('now') - julianday(completed_at)) * 86400 AS INTEGER)
+    FROM todos
+'''
+
+@app.template_filter('format_datetime')
+@functools.lru_cache(maxsize=4096)
 def format_datetime(datetime_str):
     """格式化时间字符串为可读格式"""
     if not datetime_str:
         return None
     try:
-        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-        return dt.strftime('%Y年%m月%d日 %H:%M')
-    except:
+        dt = parse_datetime(datetime_str)
+    except ValueError:
         return datetime_str
+    # 格式为 '%Y年%m月%d日 %H:%M'，与SQL中的 strftime 一致
+    return f"{dt.year}年{dt.month:02d}月{dt.day:02d}日 {dt.hour:02d}:{dt.minute:02d}"
 
+@app.template_filter('relative_time')
 def get_relative_time(datetime_str):
     """获取相对时间(如:2小时前)"""
     if not datetime_str:
         return None
     try:
-        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-        now = datetime.now()
-        diff = now - dt
-        
-        if diff.days > 0:
-            return f"{diff.days}天前"
-        elif diff.seconds > 3600:
-            hours = diff.seconds // 3600
-            return f"{hours}小时前"
-        elif diff.seconds > 60:
-            minutes = diff.seconds // 60
-            return f"{minutes}分钟前"
-        else:
-            return "刚刚"
-    except:
+        return relative_time_since(parse_timestamp(datetime_str))
+    except ValueError:
         return None
 
-# 注册模板过滤器
-app.jinja_env.filters['format_datetime'] = format_datetime
-app.jinja_env.filters['relative_time'] = get_relative_time
+# 启动时需要预编译的模板
+TEMPLATE_NAMES = ("index.html", "edit.html")
+
+def precompile_templates():
+    """非调试模式下关闭模板自动重载并预编译模板，避免请求时stat和首次编译"""
+    if app.debug:
+        return
+    # 只改jinja环境不改配置，app.run(debug=True) 时仍会重新打开自动重载
+    app.jinja_env.auto_reload = False
+    for name in TEMPLATE_NAMES:
+        app.jinja_env.get_template(name)
+
+precompile_templates()
+
+def with_relative_times(rows):
+    """逐行把经过的秒数换算成相对时间描述，供模板直接输出"""
+    for row in rows:
+        todo = dict(row)
+        todo['created_relative'] = relative_time_from_seconds(todo['created_age'])
+        todo['completed_relative'] = relative_time_from_seconds(todo['completed_age'])
+        yield todo
 
 def init_db():
-    """初始化数据库"""
-    with sqlite3.connect(DATABASE) as conn:
+    """初始化数据库（同时预热连接池）"""
+    with get_conn() as conn:
         conn.execute('''
             CREATE TABLE IF NOT EXISTS todos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,110 +115,100 @@ def init_db():
                 completed BOOLEAN DEFAULT 0,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 completed_at TEXT NULL,
-                priority TEXT DEFAULT 'medium'
+                priority TEXT DEFAULT 'medium',
+                priority_rank INTEGER DEFAULT 2
+            )
+        ''')
+        
+        # 旧数据库没有 priority_rank 列，补上并按现有优先级回填
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(todos)")}
+        if 'priority_rank' not in columns:
+            conn.execute("ALTER TABLE todos ADD COLUMN priority_rank INTEGER DEFAULT 2")
+            conn.execute(
+                "UPDATE todos SET priority_rank = " + SQL_PRIORITY_RANK
             )
+        
+        conn.execute("DROP INDEX IF EXISTS idx_todos_completed_priority_created")
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_todos_completed_rank_created
+            ON todos (completed, priority_rank, created_at)
         ''')
-        conn.commit()
 
-def get_db_connection():
-    """获取数据库连接"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # 使结果可以像字典一样访问
-    return conn
+def get_form_priority():
+    """读取表单中的优先级，无效值按medium处理"""
+    priority = request.form.get("priority", "medium")
+    return priority if priority in VALID_PRIORITIES else "medium"
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
         content = request.form.get("content", "").strip()
-        priority = request.form.get("priority", "medium")
+        priority = get_form_priority()
         
         if content:
-            conn = get_db_connection()
-            conn.execute(
-                "INSERT INTO todos (content, priority) VALUES (?, ?)",
-                (content, priority)
-            )
-            conn.commit()
-            conn.close()
+            with get_conn() as conn:
+                conn.execute(SQL_INSERT_TODO, (content, priority, PRIORITY_RANK[priority]))
             flash("任务添加成功！", "success")
         else:
             flash("任务内容不能为空！", "error")
         
         return redirect(url_for("index"))
     
-    # 获取所有任务并排序
-    conn = get_db_connection()
-    todos = conn.execute('''
-        SELECT * FROM todos 
-        ORDER BY 
-            completed ASC,
-            CASE priority 
-                WHEN 'high' THEN 1 
-                WHEN 'medium' THEN 2 
-                WHEN 'low' THEN 3 
-                ELSE 2 
-            END ASC,
-            created_at ASC
-    ''').fetchall()
-    conn.close()
+    # 获取所有任务并排序：直接把游标交给模板逐行迭代，渲染期间保持连接
+    with get_conn() as conn:
+        todos = with_relative_times(conn.execute(SQL_SELECT_TODOS))
+        html = render_template("index.html", todos=todos)
     
-    return render_template("index.html", todos=todos)
+    # 带上ETag，内容未变化时浏览器重新验证只会得到304
+    response = make_response(html)
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-@app.route("/complete/<int:todo_id>")
-def complete(todo_id):
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE todos SET completed = 1, completed_at = ? WHERE id = ?",
-        (datetime.now().isoformat(), todo_id)
-    )
-    conn.commit()
-    conn.close()
-    flash("任务已标记为完成！", "success")
+def is_xhr():
+    """判断是否为前端fetch发起的异步请求"""
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+def mutation_response(message, category):
+    """异步请求返回204由前端就地更新，普通表单提交则提示后重定向"""
+    if is_xhr():
+        return "", 204
+    flash(message, category)
     return redirect(url_for("index"))
 
-@app.route("/uncomplete/<int:todo_id>")
+@app.route("/complete/<int:todo_id>", methods=["POST"])
+def complete(todo_id):
+    with get_conn() as conn:
+        conn.execute(SQL_COMPLETE, (todo_id,))
+    return mutation_response("任务已标记为完成！", "success")
+
+@app.route("/uncomplete/<int:todo_id>", methods=["POST"])
 def uncomplete(todo_id):
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE todos SET completed = 0, completed_at = NULL WHERE id = ?",
-        (todo_id,)
-    )
-    conn.commit()
-    conn.close()
-    flash("任务已标记为未完成！", "info")
-    return redirect(url_for("index"))
+    with get_conn() as conn:
+        conn.execute(SQL_UNCOMPLETE, (todo_id,))
+    return mutation_response("任务已标记为未完成！", "info")
 
-@app.route("/delete/<int:todo_id>")
+@app.route("/delete/<int:todo_id>", methods=["POST"])
 def delete(todo_id):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
-    conn.commit()
-    conn.close()
-    flash("任务已删除！", "info")
-    return redirect(url_for("index"))
+    with get_conn() as conn:
+        conn.execute(SQL_DELETE, (todo_id,))
+    return mutation_response("任务已删除！", "info")
 
 @app.route("/edit/<int:todo_id>", methods=["GET", "POST"])
 def edit(todo_id):
-    conn = get_db_connection()
-    
-    if request.method == "POST":
-        content = request.form.get("content", "").strip()
-        priority = request.form.get("priority", "medium")
+    with get_conn() as conn:
+        if request.method == "POST":
+            content = request.form.get("content", "").strip()
+            priority = get_form_priority()
+            
+            if content:
+                conn.execute(SQL_UPDATE_TODO, (content, priority, PRIORITY_RANK[priority], todo_id))
+                flash("任务更新成功！", "success")
+                return redirect(url_for("index"))
+            else:
+                flash("任务内容不能为空！", "error")
         
-        if content:
-            conn.execute(
-                "UPDATE todos SET content = ?, priority = ? WHERE id = ?",
-                (content, priority, todo_id)
-            )
-            conn.commit()
-            conn.close()
-            flash("任务更新成功！", "success")
-            return redirect(url_for("index"))
-        else:
-            flash("任务内容不能为空！", "error")
-    
-    todo = conn.execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
-    conn.close()
+        todo = conn.execute(SQL_SELECT_TODO, (todo_id,)).fetchone()
     
     if todo is None:
         flash("任务不存在！", "error")
@@ -166,41 +216,58 @@ def edit(todo_id):
     
     return render_template("edit.html", todo=todo)
 
+def data_etag(*parts):
+    """根据查询出的数据签名生成简短的ETag"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+def cached_json(etag, build):
+    """客户端缓存仍然有效时直接返回304，否则调用build生成JSON"""
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.cache_control.max_age = 5
+    return response
+
 @app.route("/api/stats")
 def api_stats():
     """获取任务统计信息"""
-    conn = get_db_connection()
-    total = conn.execute("SELECT COUNT(*) FROM todos").fetchone()[0]
-    completed = conn.execute("SELECT COUNT(*) FROM todos WHERE completed = 1").fetchone()[0]
-    conn.close()
+    with get_conn() as conn:
+        total, completed = conn.execute(SQL_STATS).fetchone()
     
-    pending = total - completed
-    completion_rate = round((completed / total * 100) if total > 0 else 0, 1)
+    def build():
+        pending = total - completed
+        completion_rate = round((completed / total * 100) if total > 0 else 0, 1)
+        return {
+            "total": total,
+            "completed": completed,
+            "pending": pending,
+            "completion_rate": completion_rate
+        }
     
-    return jsonify({
-        "total": total,
-        "completed": completed,
-        "pending": pending,
-        "completion_rate": completion_rate
-    })
+    # 统计结果本身就是签名
+    return cached_json(data_etag(total, completed), build)
 
 @app.route("/api/times")
 def api_times():
     """获取所有任务的格式化时间信息"""
-    conn = get_db_connection()
-    todos = conn.execute("SELECT id, created_at, completed_at FROM todos").fetchall()
-    conn.close()
-    
-    times_data = {}
-    for todo in todos:
-        times_data[todo['id']] = {
-            'created_formatted': format_datetime(todo['created_at']),
-            'created_relative': get_relative_time(todo['created_at']),
-            'completed_formatted': format_datetime(todo['completed_at']) if todo['completed_at'] else None,
-            'completed_relative': get_relative_time(todo['completed_at']) if todo['completed_at'] else None
+    def build():
+        # 格式化和时间差都在SQL中完成，Python只负责把秒数映射为描述
+        return {
+            todo_id: {
+                'created_formatted': created_fmt,
+                'created_relative': relative_time_from_seconds(created_secs),
+                'completed_formatted': completed_fmt,
+                'completed_relative': relative_time_from_seconds(completed_secs)
+            }
+            for (todo_id, created_fmt, created_secs, completed_fmt, completed_secs)
+            in conn.execute(SQL_TIMES)
         }
     
-    return jsonify(times_data)
+    with get_conn() as conn:
+        etag = data_etag(*conn.execute(SQL_TIMES_SIGNATURE).fetchone())
+        return cached_json(etag, build)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -210,15 +277,12 @@ def not_found(error):
 if __name__ == "__main__":
     # 初始化数据库
     init_db()
-    print("🚀 Flask Todo 应用启动中...")
-    print("📱 访问地址: http://localhost:5000")
-    print("💡 按 Ctrl+C 停止服务器")
-    app.run(debug=True, host='0.0.0.0', port=5000)      
-    
-
-
-
-
-
-
-
+    # 开发服务器单线程且带调试器，只在显式设置 FLASK_DEV 时启动
+    if os.environ.get("FLASK_DEV"):
+        print("🚀 Flask Todo 应用启动中...")
+        print("📱 访问地址: http://localhost:5000")
+        print("💡 按 Ctrl+C 停止服务器")
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    else:
+        print("生产环境请使用: gunicorn --config gunicorn.conf.py wsgi:app")
+        print("本地开发请使用: FLASK_DEV=1 python app.py")
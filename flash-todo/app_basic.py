@@ -1,22 +1,25 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
-import sqlite3
-from datetime import datetime, timedelta
+import functools
 import os
 
+from core import ConnectionPool, parse_datetime, parse_timestamp, relative_time_since
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
 
 # Template filters
 @app.template_filter('format_datetime')
+@functools.lru_cache(maxsize=4096)
 def format_datetime(value):
     if value is None:
         return ''
     if isinstance(value, str):
         try:
-            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
-        except:
+            value = parse_datetime(value)
+        except ValueError:
             return value
-    return value.strftime('%Y-%m-%d %H:%M')
+    # Same output as strftime('%Y-%m-%d %H:%M') without parsing the format string
+    return f"{value.year}-{value.month:02d}-{value.day:02d} {value.hour:02d}:{value.minute:02d}"
 
 @app.template_filter('relative_time')
 def relative_time(value):
@@ -24,56 +27,55 @@ def relative_time(value):
         return ''
     if isinstance(value, str):
         try:
-            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
-        except:
+            timestamp = parse_timestamp(value)
+        except ValueError:
             return value
-    
-    now = datetime.now()
-    diff = now - value
-    
-    if diff.days > 0:
-        return f'{diff.days}天前'
-    elif diff.seconds > 3600:
-        hours = diff.seconds // 3600
-        return f'{hours}小时前'
-    elif diff.seconds > 60:
-        minutes = diff.seconds // 60
-        return f'{minutes}分钟前'
     else:
-        return '刚刚'
+        timestamp = int(value.timestamp())
+    return relative_time_since(timestamp)
 
 # Database setup
-def get_db():
-    db = sqlite3.connect('todo_basic.db')
-    db.row_factory = sqlite3.Row
-    return db
+DATABASE = 'todo_basic.db'
+POOL_SIZE = 8
+pool = ConnectionPool(DATABASE, POOL_SIZE)
+get_conn = pool.connection
+
+# SQL statements are module constants so SQLite's statement cache hits on the text
+SQL_STATS = 'SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM todos'
+SQL_SELECT_TODOS = 'SELECT id, content, completed, priority, created_at FROM todos ORDER BY created_at DESC'
+SQL_SELECT_TODO = 'SELECT id, content, completed, priority, created_at FROM todos WHERE id = ?'
+SQL_SELECT_COMPLETED = 'SELECT completed FROM todos WHERE id = ?'
+SQL_INSERT_TODO = 'INSERT INTO todos (content, priority) VALUES (?, ?)'
+SQL_SET_COMPLETED = 'UPDATE todos SET completed = ? WHERE id = ?'
+SQL_DELETE = 'DELETE FROM todos WHERE id = ?'
+SQL_DELETE_ALL = 'DELETE FROM todos'
+SQL_UPDATE_TODO = 'UPDATE todos SET content = ?, priority = ? WHERE id = ?'
 
 def init_db():
-    db = get_db()
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            content TEXT NOT NULL,
-            completed BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            priority TEXT DEFAULT 'medium'
-        )
-    ''')
-    db.commit()
-    db.close()
+    with get_conn() as db:
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS todos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content TEXT NOT NULL,
+                completed BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                priority TEXT DEFAULT 'medium'
+            )
+        ''')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_todos_created_at ON todos (created_at)')
 
 # Routes
 @app.route('/')
 def index():
-    db = get_db()
-    todos = db.execute('SELECT * FROM todos ORDER BY created_at DESC').fetchall()
-    stats = {
-        'total': len(todos),
-        'completed': len([t for t in todos if t['completed']]),
-        'pending': len([t for t in todos if not t['completed']])
-    }
-    db.close()
-    return render_template('index_basic.html', todos=todos, stats=stats)
+    with get_conn() as db:
+        stats = dict(zip(
+            ('total', 'completed'),
+            db.execute(SQL_STATS).fetchone()
+        ))
+        stats['pending'] = stats['total'] - stats['completed']
+        # The template walks the cursor once, so render while the connection is held
+        todos = db.execute(SQL_SELECT_TODOS)
+        return render_template('index_basic.html', todos=todos, stats=stats)
 
 @app.route('/add', methods=['POST'])
 def add_todo():
@@ -84,79 +86,72 @@ def add_todo():
         flash('Task content cannot be empty', 'error')
         return redirect(url_for('index'))
     
-    db = get_db()
-    db.execute('INSERT INTO todos (content, priority) VALUES (?, ?)', (content, priority))
-    db.commit()
-    db.close()
+    with get_conn() as db:
+        db.execute(SQL_INSERT_TODO, (content, priority))
     
     flash('Task added successfully!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/toggle/<int:todo_id>')
 def toggle_todo(todo_id):
-    db = get_db()
-    todo = db.execute('SELECT * FROM todos WHERE id = ?', (todo_id,)).fetchone()
-    if todo:
-        new_status = 0 if todo['completed'] else 1
-        db.execute('UPDATE todos SET completed = ? WHERE id = ?', (new_status, todo_id))
-        db.commit()
-        flash('Task status updated!', 'success')
-    db.close()
+    # The connection's own context manager commits on success and rolls back on error
+    with get_conn() as db, db:
+        # Read-then-write needs the write lock up front so the flip is atomic
+        db.execute('BEGIN IMMEDIATE')
+        todo = db.execute(SQL_SELECT_COMPLETED, (todo_id,)).fetchone()
+        if todo:
+            new_status = 0 if todo['completed'] else 1
+            db.execute(SQL_SET_COMPLETED, (new_status, todo_id))
+            flash('Task status updated!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/delete/<int:todo_id>')
 def delete_todo(todo_id):
-    db = get_db()
-    db.execute('DELETE FROM todos WHERE id = ?', (todo_id,))
-    db.commit()
-    db.close()
+    with get_conn() as db:
+        db.execute(SQL_DELETE, (todo_id,))
     flash('Task deleted!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/clear-all', methods=['POST'])
 def clear_all():
     """清空所有历史信息"""
-    db = get_db()
-    db.execute('DELETE FROM todos')
-    db.commit()
-    db.close()
+    with get_conn() as db:
+        db.execute(SQL_DELETE_ALL)
     flash('所有历史信息已清空！', 'info')
     return redirect(url_for('index'))
 
 @app.route('/edit/<int:todo_id>', methods=['GET', 'POST'])
 def edit_todo(todo_id):
-    db = get_db()
-    todo = db.execute('SELECT * FROM todos WHERE id = ?', (todo_id,)).fetchone()
-    
-    if request.method == 'POST':
-        content = request.form.get('content', '').strip()
-        priority = request.form.get('priority', 'medium')
+    with get_conn() as db:
+        todo = db.execute(SQL_SELECT_TODO, (todo_id,)).fetchone()
         
-        if not content:
-            flash('Task content cannot be empty', 'error')
-            db.close()
-            return render_template('edit.html', todo=todo)
-        
-        db.execute('UPDATE todos SET content = ?, priority = ? WHERE id = ?', 
-                  (content, priority, todo_id))
-        db.commit()
-        db.close()
-        flash('Task updated successfully!', 'success')
-        return redirect(url_for('index'))
+        if request.method == 'POST':
+            content = request.form.get('content', '').strip()
+            priority = request.form.get('priority', 'medium')
+            
+            if not content:
+                flash('Task content cannot be empty', 'error')
+                return render_template('edit.html', todo=todo)
+            
+            db.execute(SQL_UPDATE_TODO, (content, priority, todo_id))
+            flash('Task updated successfully!', 'success')
+            return redirect(url_for('index'))
     
-    db.close()
     return render_template('edit.html', todo=todo)
 
 if __name__ == '__main__':
     # Initialize database if it doesn't exist
-    if not os.path.exists('todo_basic.db'):
+    if not os.path.exists(DATABASE):
         init_db()
         print("Database initialized successfully!")
     
-    # 启动应用
-    print("🚀 Flash Todo 应用启动中...")
-    print("🌐 地址: http://0.0.0.0:5001")
-    print("🔧 调试: 开启")
-    print("💡 按 Ctrl+C 停止服务器")
-    
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # The Werkzeug dev server is single-threaded and runs the debugger; only use it when asked to
+    if os.environ.get('FLASK_DEV'):
+        print("🚀 Flash Todo 应用启动中...")
+        print("🌐 地址: http://0.0.0.0:5001")
+        print("🔧 调试: 开启")
+        print("💡 按 Ctrl+C 停止服务器")
+        app.run(host='0.0.0.0', port=5001, debug=True)
+    else:
+        print("In production run: gunicorn --config gunicorn.conf.py wsgi:basic_app")
+        print("For local development run: FLASK_DEV=1 python app_basic.py")
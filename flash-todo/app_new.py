@@ -1,19 +1,32 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from datetime import datetime
+from itertools import islice
 import logging
 from logging.handlers import RotatingFileHandler
 
 from config import config
-from models import db
-from services import TodoService, CategoryService, TagService
+from models import db, init_db
+from services import TodoService, CategoryService, TagService, STREAM_BATCH_SIZE
 from utils import DateTimeUtils, ValidationUtils, ErrorHandler
 
+# 启动时预编译的模板
+PRECOMPILED_TEMPLATES = ('index.html', 'edit.html')
+
+# 限流器只创建一次，在 create_app 中绑定到应用；计数保存在进程内存中
+# limits 5 已移除 fixed-window-elastic-expiry 策略，这里使用普通固定窗口
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri="memory://",
+    strategy="fixed-window"
+)
+
 def create_app(config_name='development'):
     """应用工厂函数"""
     app = Flask(__name__)
@@ -22,16 +35,12 @@ def create_app(config_name='development'):
     app.config.from_object(config[config_name])
     
     # 初始化扩展
-    db.init_app(app)
+    init_db(app)
     migrate = Migrate(app, db)
     CORS(app)
     
     # 初始化限流器
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"]
-    )
+    limiter.init_app(app)
     
     # 配置日志
     if not app.debug and not app.testing:
@@ -50,6 +59,13 @@ def create_app(config_name='development'):
     app.jinja_env.filters['format_datetime'] = DateTimeUtils.format_datetime
     app.jinja_env.filters['relative_time'] = DateTimeUtils.get_relative_time
     
+    # 生产环境关闭模板自动重载，并在启动时预编译模板
+    if not app.debug:
+        app.config['TEMPLATES_AUTO_RELOAD'] = False
+        app.jinja_env.auto_reload = False
+        for template_name in PRECOMPILED_TEMPLATES:
+            app.jinja_env.get_template(template_name)
+    
     # 注册路由
     register_routes(app)
     
@@ -62,7 +78,7 @@ def register_routes(app):
     """注册路由"""
     
     @app.route("/", methods=["GET", "POST"])
-    @limiter.limit("10 per minute")
+    @limiter.limit("10 per minute", methods=["POST"])
     def index():
         """主页 - 显示任务列表"""
         if request.method == "POST":
@@ -116,14 +132,14 @@ def register_routes(app):
             sort_by = request.args.get('sort_by', 'priority')
             order = request.args.get('order', 'asc')
             
-            # 获取任务列表
-            todos = TodoService.get_all_todos(filters, sort_by, order)
+            # 获取任务列表（列表页不显示备注和标签，不加载这两列）
+            todos = TodoService.get_all_todos(filters, sort_by, order, summary=True)
             
-            # 获取分类列表
-            categories = CategoryService.get_all_categories()
+            # 获取分类列表（进程内缓存的只读快照）
+            categories = CategoryService.get_category_snapshot()
             
             # 获取标签列表
-            tags = TagService.get_all_tags()
+            tags = TagService.get_tag_snapshot()
             
             return render_template("index.html", 
                                  todos=todos, 
@@ -145,8 +161,8 @@ def register_routes(app):
             if not todo:
                 abort(404)
             
-            categories = CategoryService.get_all_categories()
-            tags = TagService.get_all_tags()
+            categories = CategoryService.get_category_snapshot()
+            tags = TagService.get_tag_snapshot()
             
             return render_template("todo_detail.html", 
                                  todo=todo, 
@@ -191,8 +207,8 @@ def register_routes(app):
                 flash("任务更新成功！", "success")
                 return redirect(url_for("index"))
             
-            categories = CategoryService.get_all_categories()
-            tags = TagService.get_all_tags()
+            categories = CategoryService.get_category_snapshot()
+            tags = TagService.get_tag_snapshot()
             
             return render_template("edit.html", 
                                  todo=todo, 
@@ -241,6 +257,7 @@ def register_routes(app):
     
     # API路由
     @app.route("/api/todos", methods=["GET"])
+    @limiter.exempt
     def api_get_todos():
         """API: 获取任务列表"""
         try:
@@ -259,8 +276,29 @@ def register_routes(app):
             sort_by = request.args.get('sort_by', 'priority')
             order = request.args.get('order', 'asc')
             
-            todos = TodoService.get_all_todos(filters, sort_by, order)
-            return jsonify([todo.to_dict() for todo in todos])
+            todos = TodoService.iter_todos(filters, sort_by, order)
+            now = datetime.utcnow()
+            dumps = app.json.dumps
+            
+            # 第一批在返回响应之前序列化：查询或序列化出错时仍能返回500和错误信息
+            first = [dumps(todo.to_dict(now)) for todo in islice(todos, STREAM_BATCH_SIZE)]
+            if len(first) < STREAM_BATCH_SIZE:
+                return app.response_class('[' + ','.join(first) + ']', mimetype='application/json')
+            
+            def generate():
+                # 其余任务逐条输出JSON数组元素，不必先把整个列表载入内存
+                yield '[' + ','.join(first)
+                try:
+                    for todo in todos:
+                        yield ',' + dumps(todo.to_dict(now))
+                except Exception:
+                    # 状态码和开头部分已经发出，只能记录错误后结束输出；
+                    # 不补 ']'，客户端解析时能发现响应不完整，不会误当作完整列表
+                    app.logger.exception('流式输出任务列表失败')
+                    return
+                yield ']'
+            
+            return app.response_class(stream_with_context(generate()), mimetype='application/json')
         
         except Exception as e:
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
@@ -282,6 +320,7 @@ def register_routes(app):
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
     
     @app.route("/api/todos/<int:todo_id>", methods=["GET"])
+    @limiter.exempt
     def api_get_todo(todo_id):
         """API: 获取单个任务"""
         try:
@@ -321,21 +360,23 @@ def register_routes(app):
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
     
     @app.route("/api/stats")
+    @limiter.exempt
     def api_stats():
         """API: 获取统计信息"""
         try:
             stats = TodoService.get_stats()
-            return jsonify(stats)
+            return jsonify(stats.to_dict())
         
         except Exception as e:
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
     
     @app.route("/api/categories", methods=["GET"])
+    @limiter.exempt
     def api_get_categories():
         """API: 获取分类列表"""
         try:
-            categories = CategoryService.get_all_categories()
-            return jsonify([category.to_dict() for category in categories])
+            categories = CategoryService.get_categories_with_counts()
+            return jsonify([category.to_dict(todo_count) for category, todo_count in categories])
         
         except Exception as e:
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
@@ -361,11 +402,11 @@ def register_routes(app):
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
     
     @app.route("/api/tags", methods=["GET"])
+    @limiter.exempt
     def api_get_tags():
         """API: 获取标签列表"""
         try:
-            tags = TagService.get_all_tags()
-            return jsonify([tag.to_dict() for tag in tags])
+            return jsonify(list(TagService.get_tag_snapshot()))
         
         except Exception as e:
             return jsonify({'error': ErrorHandler.handle_general_error(e)}), 500
@@ -415,19 +456,11 @@ def register_error_handlers(app):
         return redirect(url_for("index"))
         
 
-# 全局变量
-limiter = None
-
 if __name__ == "__main__":
     app = create_app()
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"]
-    )
     
     print("🚀 Flask Todo 应用启动中...")
     print("📱 访问地址: http://localhost:5000")
     print("💡 按 Ctrl+C 停止服务器")
     
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,20 +1,76 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask.json.provider import JSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from flask_caching import Cache
+from cachelib import RedisCache
+from sqlalchemy import func, case
 from datetime import datetime
 import os
+import queue
+import threading
+import orjson
+
+from core import register_sqlite_pragmas
+from utils import DateTimeUtils
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, which serializes datetimes natively."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Basic configuration
 app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///todo_simple.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///todo_simple.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['TODOS_PER_PAGE'] = 20
+# SimpleCache is per process; set CACHE_TYPE=RedisCache (and CACHE_REDIS_URL) so gunicorn workers share it
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'SimpleCache')
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL')
+app.config['CACHE_DEFAULT_TIMEOUT'] = 30
 
 # Initialize extensions
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+cache = Cache(app)
+
+# index.html formats ORM timestamps with these filters (app.py formats them in SQL)
+app.jinja_env.filters['format_datetime'] = DateTimeUtils.format_datetime
+app.jinja_env.filters['relative_time'] = DateTimeUtils.get_relative_time
+
+def todos_cache_key():
+    """Cache key for todo reads; it changes whenever a write bumps the version."""
+    return f"todos:{cache.get('todos_version') or 0}"
+
+# Serializes version bumps for in-process cache backends
+_version_lock = threading.Lock()
+
+def invalidate_todos_cache():
+    """Move reads to a fresh key after any todo write.
+
+    The bump must be atomic: if two writers both stored N+1, a read between their
+    commits would cache stale data under the key the second write moves to.
+    Redis increments atomically across processes. Other backends implement inc
+    as get + set (which also resets the key's timeout), so there the bump is
+    done under a lock and stored without expiry.
+    """
+    if isinstance(cache.cache, RedisCache):
+        cache.inc('todos_version')
+        return
+    with _version_lock:
+        cache.set('todos_version', (cache.get('todos_version') or 0) + 1, timeout=0)
+
+# Enable WAL and friends on this app's connections so readers are not blocked by writers
+with app.app_context():
+    register_sqlite_pragmas(db.engine)
 
 # Simple Todo model
 class Todo(db.Model):
@@ -24,25 +80,187 @@ class Todo(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     priority = db.Column(db.String(20), default='medium')
 
-    def to_dict(self):
+    # Covers both the newest-first page fetch and the completed count on the index page
+    __table_args__ = (
+        db.Index('ix_todos_created_completed', created_at.desc(), completed),
+    )
+
+    # Columns serialized by the API; row_to_dict works on these
+    API_COLUMNS = (id, content, completed, created_at, priority)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a model instance or a Core result row with the API columns."""
         return {
-            'id': self.id,
-            'content': self.content,
-            'completed': self.completed,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'priority': self.priority
+            'id': row.id,
+            'content': row.content,
+            'completed': row.completed,
+            'created_at': row.created_at,
+            'priority': row.priority
         }
 
+    def to_dict(self):
+        return Todo.row_to_dict(self)
+
+# Write-behind queue: form mutations are queued and a background thread applies
+# them in batches, one transaction (and one fsync) per batch. The submitting
+# request waits until its operation is applied, so concurrent writes share a
+# commit while each user still reads their own write after the redirect.
+# Pass ?sync=1 to write immediately; a full queue also falls back to a
+# synchronous write.
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_SIZE = 100
+# How long a request waits for the writer before reporting the write as queued
+WRITE_WAIT_TIMEOUT = 5
+write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+_writer_lock = threading.Lock()
+_writer_thread = None
+
+class PendingWrite:
+    """A queued operation; the worker records its row count or error and sets done."""
+    __slots__ = ('op', 'payload', 'done', 'rowcount', 'error')
+
+    def __init__(self, op, payload):
+        self.op = op
+        self.payload = payload
+        self.done = threading.Event()
+        self.rowcount = None
+        self.error = None
+
+def _insert_todo(values):
+    return db.session.execute(db.insert(Todo).values(values))
+
+def _toggle_todo(todo_id):
+    # Flip the flag in SQL: one UPDATE instead of SELECT + UPDATE
+    return db.session.execute(
+        db.update(Todo).where(Todo.id == todo_id).values(completed=~Todo.completed)
+    )
+
+def _delete_todo(todo_id):
+    return db.session.execute(db.delete(Todo).where(Todo.id == todo_id))
+
+WRITE_OPS = {'add': _insert_todo, 'toggle': _toggle_todo, 'delete': _delete_todo}
+
+def _apply_batch(batch):
+    """Apply the batch in one transaction; on failure retry each write in its own."""
+    try:
+        rowcounts = [WRITE_OPS[w.op](w.payload).rowcount for w in batch]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        app.logger.warning('Write-behind batch of %d operations failed; retrying one by one',
+                           len(batch), exc_info=True)
+    else:
+        for write, rowcount in zip(batch, rowcounts):
+            write.rowcount = rowcount
+        return
+
+    # Only the writes that fail on their own are dropped
+    for write in batch:
+        try:
+            write.rowcount = WRITE_OPS[write.op](write.payload).rowcount
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            write.error = e
+            app.logger.exception('Write-behind %s failed: %r', write.op, write.payload)
+
+def write_behind_worker():
+    """Drain the write queue, applying up to WRITE_BATCH_SIZE operations per commit."""
+    while True:
+        batch = [write_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(write_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with app.app_context():
+                _apply_batch(batch)
+                invalidate_todos_cache()
+        except Exception as e:
+            # e.g. the rollback or the cache backend failed: report it to every
+            # waiting request and keep the writer running for the next batch
+            app.logger.exception('Write-behind batch of %d operations could not be completed', len(batch))
+            for write in batch:
+                if write.error is None:
+                    write.error = e
+        finally:
+            for write in batch:
+                write.done.set()
+                write_queue.task_done()
+
+def ensure_writer_started():
+    """Start the writer thread unless it is running in this process.
+
+    A thread started before gunicorn forks is not alive in the worker, and a
+    writer that died for any reason is replaced.
+    """
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=write_behind_worker, name='write-behind', daemon=True)
+            _writer_thread.start()
+
+def submit_write(op, payload):
+    """Apply a write through the queue (or directly with ?sync or a full queue) and return its row count.
+
+    Returns None if the writer has not applied it within WRITE_WAIT_TIMEOUT; a
+    failed write re-raises its error.
+    """
+    if not request.args.get('sync'):
+        ensure_writer_started()
+        write = PendingWrite(op, payload)
+        try:
+            write_queue.put_nowait(write)
+        except queue.Full:
+            pass
+        else:
+            if not write.done.wait(WRITE_WAIT_TIMEOUT):
+                return None
+            if write.error is not None:
+                raise write.error
+            return write.rowcount
+    rowcount = WRITE_OPS[op](payload).rowcount
+    db.session.commit()
+    invalidate_todos_cache()
+    return rowcount
+
+def flash_write_result(rowcount, message):
+    """Flash message for an applied write, or a notice that it is still queued."""
+    if rowcount is None:
+        flash('Change queued; it will appear shortly.', 'info')
+    else:
+        flash(message, 'success')
+
 # Routes
 @app.route('/')
 def index():
-    todos = Todo.query.order_by(Todo.created_at.desc()).all()
-    stats = {
-        'total': len(todos),
-        'completed': len([t for t in todos if t.completed]),
-        'pending': len([t for t in todos if not t.completed])
-    }
-    return render_template('index.html', todos=todos, stats=stats)
+    todos = (Todo.query
+             .order_by(Todo.created_at.desc())
+             .limit(app.config['TODOS_PER_PAGE'])
+             .all())
+    return render_template('index.html', todos=todos, stats=get_stats())
+
+def get_stats():
+    """Index page counters, cached until the next write."""
+    key = todos_cache_key() + ':stats'
+    stats = cache.get(key)
+    if stats is None:
+        # Count in SQL instead of loading every row just to measure it
+        total, completed = db.session.query(
+            func.count(Todo.id),
+            func.coalesce(func.sum(case((Todo.completed, 1), else_=0)), 0)
+        ).one()
+        stats = {
+            'total': total,
+            'completed': completed,
+            'pending': total - completed
+        }
+        cache.set(key, stats)
+    return stats
 
 @app.route('/add', methods=['POST'])
 def add_todo():
@@ -51,30 +269,29 @@ def add_todo():
     
     if not content:
         flash('Task content cannot be empty', 'error')
-        return redirect(url_for('index'))
+        return redirect(INDEX_URL)
     
-    todo = Todo(content=content, priority=priority)
-    db.session.add(todo)
-    db.session.commit()
+    # Stamp created_at now so queued inserts keep request order
+    rowcount = submit_write('add', {'content': content, 'priority': priority, 'created_at': datetime.utcnow()})
     
-    flash('Task added successfully!', 'success')
-    return redirect(url_for('index'))
+    flash_write_result(rowcount, 'Task added successfully!')
+    return redirect(INDEX_URL)
 
 @app.route('/toggle/<int:todo_id>')
 def toggle_todo(todo_id):
-    todo = Todo.query.get_or_404(todo_id)
-    todo.completed = not todo.completed
-    db.session.commit()
-    flash('Task status updated!', 'success')
-    return redirect(url_for('index'))
+    rowcount = submit_write('toggle', todo_id)
+    if rowcount == 0:
+        abort(404)
+    flash_write_result(rowcount, 'Task status updated!')
+    return redirect(INDEX_URL)
 
 @app.route('/delete/<int:todo_id>')
 def delete_todo(todo_id):
-    todo = Todo.query.get_or_404(todo_id)
-    db.session.delete(todo)
-    db.session.commit()
-    flash('Task deleted!', 'success')
-    return redirect(url_for('index'))
+    rowcount = submit_write('delete', todo_id)
+    if rowcount == 0:
+        abort(404)
+    flash_write_result(rowcount, 'Task deleted!')
+    return redirect(INDEX_URL)
 
 @app.route('/edit/<int:todo_id>', methods=['GET', 'POST'])
 def edit_todo(todo_id):
@@ -91,16 +308,25 @@ def edit_todo(todo_id):
         todo.content = content
         todo.priority = priority
         db.session.commit()
+        invalidate_todos_cache()
         flash('Task updated successfully!', 'success')
-        return redirect(url_for('index'))
+        return redirect(INDEX_URL)
     
     return render_template('edit.html', todo=todo)
 
 # API routes
 @app.route('/api/todos')
+@cache.cached(key_prefix=todos_cache_key)
 def api_todos():
-    todos = Todo.query.order_by(Todo.created_at.desc()).all()
-    return jsonify([todo.to_dict() for todo in todos])
+    # Plain Core rows: no ORM hydration for objects that are only serialized
+    rows = db.session.execute(
+        db.select(*Todo.API_COLUMNS).order_by(Todo.created_at.desc())
+    ).all()
+    response = jsonify([Todo.row_to_dict(row) for row in rows])
+    # Let the browser and any proxy reuse the list for a short while
+    response.cache_control.public = True
+    response.cache_control.max_age = 30
+    return response
 
 @app.route('/api/todos', methods=['POST'])
 def api_add_todo():
@@ -114,36 +340,57 @@ def api_add_todo():
     todo = Todo(content=content, priority=priority)
     db.session.add(todo)
     db.session.commit()
+    invalidate_todos_cache()
     
     return jsonify(todo.to_dict()), 201
 
 @app.route('/api/todos/<int:todo_id>', methods=['PUT'])
 def api_update_todo(todo_id):
-    todo = Todo.query.get_or_404(todo_id)
     data = request.get_json()
+    values = {}
     
     if 'content' in data:
         content = data['content'].strip()
         if not content:
             return jsonify({'error': 'Task content cannot be empty'}), 400
-        todo.content = content
+        values['content'] = content
     
     if 'completed' in data:
-        todo.completed = data['completed']
+        values['completed'] = data['completed']
     
     if 'priority' in data:
-        todo.priority = data['priority']
+        values['priority'] = data['priority']
     
-    db.session.commit()
-    return jsonify(todo.to_dict())
+    if not values:
+        row = db.session.execute(
+            db.select(*Todo.API_COLUMNS).where(Todo.id == todo_id)
+        ).first()
+    else:
+        # One UPDATE ... RETURNING: no prior SELECT and no ORM instance
+        row = db.session.execute(
+            db.update(Todo).where(Todo.id == todo_id).values(values).returning(*Todo.API_COLUMNS)
+        ).first()
+        db.session.commit()
+    if row is None:
+        abort(404)
+    if values:
+        invalidate_todos_cache()
+    return jsonify(Todo.row_to_dict(row))
 
 @app.route('/api/todos/<int:todo_id>', methods=['DELETE'])
 def api_delete_todo(todo_id):
-    todo = Todo.query.get_or_404(todo_id)
-    db.session.delete(todo)
+    result = _delete_todo(todo_id)
     db.session.commit()
+    if result.rowcount == 0:
+        abort(404)
+    invalidate_todos_cache()
     return '', 204
 
+# The index URL takes no arguments, so build it once instead of resolving it on
+# every mutation. Assumes the app is mounted at the root (no SCRIPT_NAME prefix).
+with app.test_request_context():
+    INDEX_URL = url_for('index')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -164,19 +411,11 @@ def init_db():
         db.create_all()
         print("Database tables created successfully!")
 
+# Development entry point only. In production run under gunicorn instead:
+#     gunicorn --config gunicorn.conf.py app_simple:app
 if __name__ == '__main__':
     # Initialize database if it doesn't exist
     if not os.path.exists('todo_simple.db'):
         init_db()
     
-    app.run(debug=True, host='0.0.0.0', port=5000) 
-    app.run(
-        host=args.host,
-        port=args.port,
-        debug=args.debug,
-        host='0.0.0.0',
-        port=5000,
-        debug=True,
-        host='0.0.0.0',
-        port=5000,
-    )
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='127.0.0.1', port=5000)
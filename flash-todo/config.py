@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from sqlalchemy.pool import StaticPool
 
 class Config:
     """基础配置类"""
@@ -8,6 +9,15 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # 数据库连接池配置：连接在请求间复用，编译后的语句缓存足够容纳所有路由的查询
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+        'query_cache_size': 1200,
+    }
+    
     # 安全配置
     SESSION_COOKIE_SECURE = False  # 开发环境设为False
     SESSION_COOKIE_HTTPONLY = True
@@ -22,7 +32,7 @@ class Config:
     TODOS_PER_PAGE = 20
     
     # 缓存配置
-    CACHE_TYPE = 'simple'
+    CACHE_TYPE = 'SimpleCache'
     CACHE_DEFAULT_TIMEOUT = 300
     
     # 日志配置
@@ -52,6 +62,14 @@ class TestingConfig(Config):
     DEBUG = True
     DATABASE = 'test_todo.db'
     WTF_CSRF_ENABLED = False
+    
+    # 测试使用内存数据库：StaticPool 让所有会话共用同一个连接，表结构和数据在应用上下文之间保留，
+    # 每次 create_app 得到新的引擎，即一个全新的数据库
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False},
+    }
 
 # 配置映射
 config = {
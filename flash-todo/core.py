@@ -0,0 +1,121 @@
+"""
+SQLite版本应用（app.py / app_basic.py）共用的数据库连接池与时间处理函数，
+SQLITE_PRAGMAS 同时用于SQLAlchemy版本（app_simple.py / models.py）的连接
+"""
+
+import sqlite3
+import queue
+import functools
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context
+
+# 每个连接建立时执行的性能相关PRAGMA
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+def apply_sqlite_pragmas(conn):
+    """对新建的SQLite连接执行 SQLITE_PRAGMAS"""
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+
+def _set_pragmas_on_connect(dbapi_connection, connection_record):
+    """SQLAlchemy connect 事件：新建的SQLite连接执行 SQLITE_PRAGMAS"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_connection)
+
+def register_sqlite_pragmas(engine):
+    """只为给定的SQLAlchemy引擎注册连接监听（重复调用不会重复注册）"""
+    # SQLite版本（app.py / app_basic.py）不依赖SQLAlchemy，用到时才导入
+    from sqlalchemy import event
+    if not event.contains(engine, "connect", _set_pragmas_on_connect):
+        event.listen(engine, "connect", _set_pragmas_on_connect)
+
+class ConnectionPool:
+    """SQLite长连接池，连接按需创建，用完归还而不是关闭"""
+
+    def __init__(self, database, size=8):
+        self.database = database
+        self._pool = queue.Queue(maxsize=size)
+
+    def connect(self):
+        """创建新的数据库连接（自动提交模式，单条写语句无需显式commit）"""
+        conn = sqlite3.connect(self.database, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row  # 使结果可以像字典一样访问
+        apply_sqlite_pragmas(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """从连接池借出一个连接，归还前回滚出错时未结束的事务"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            yield conn
+        except BaseException:
+            # 不能把持有写锁的半截事务放回池里
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """关闭池中所有空闲连接（在gunicorn fork出worker之前调用，连接不能跨进程共享）"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+@functools.lru_cache(maxsize=4096)
+def parse_datetime(datetime_str):
+    """解析ISO时间字符串（同一字符串在一次渲染中会被多次解析，故做缓存）"""
+    # Python 3.11 之前的 fromisoformat 不识别结尾的 Z
+    if datetime_str.endswith('Z'):
+        datetime_str = datetime_str[:-1] + '+00:00'
+    return datetime.fromisoformat(datetime_str)
+
+def relative_time_from_seconds(seconds):
+    """根据经过的秒数返回相对时间描述"""
+    if seconds is None:
+        return None
+    if seconds >= 86400:
+        return f"{seconds // 86400}天前"
+    elif seconds > 3600:
+        return f"{seconds // 3600}小时前"
+    elif seconds > 60:
+        return f"{seconds // 60}分钟前"
+    else:
+        return "刚刚"
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(datetime_str):
+    """把ISO时间字符串换算为整数秒时间戳（每个字符串只解析一次）"""
+    return int(parse_datetime(datetime_str).timestamp())
+
+def current_timestamp():
+    """当前整数秒时间戳，同一请求内只取一次"""
+    if not has_request_context():
+        return int(time.time())
+    now = g.get('_now')
+    if now is None:
+        now = g._now = int(time.time())
+    return now
+
+def relative_time_since(timestamp):
+    """获取时间戳距今的相对时间(如:2小时前)"""
+    return relative_time_from_seconds(current_timestamp() - timestamp)
@@ -4,9 +4,16 @@ import os
 
 # 服务器配置
 bind = "0.0.0.0:5000"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
+# 路由都是短小的数据库读写（阻塞I/O），使用线程worker，每个worker同时处理 threads 个请求
+workers = multiprocessing.cpu_count() + 1
+worker_class = "gthread"
+threads = 4
+
+# 可选：协程worker，并发连接数更高。
+# 使用前需确认 SQLAlchemy/sqlite3 在 gevent monkey-patch 下的行为，并安装 gevent
+# workers = multiprocessing.cpu_count() + 1
+# worker_class = "gevent"
+# worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
 timeout = 30
@@ -20,6 +27,7 @@ loglevel = "info"
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
 # 进程配置
+# 预加载时 wsgi.py 只在主进程初始化一次数据库，且不留下跨fork共享的连接
 preload_app = True
 daemon = False
 pidfile = "gunicorn.pid"
@@ -6,23 +6,28 @@
 
 import os
 import sys
+import gzip
+import shutil
+import sqlite3
+import tempfile
 from datetime import datetime
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate, upgrade, init, migrate
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 # 添加项目根目录到Python路径    确保可以导入项目的其他模块
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))      
 # 从项目根目录导入配置和模型
 from config import config
-from models import db, Todo, Category, Tag, TodoTag, User
+from models import db, init_db, Todo, Category, Tag, TodoTag, User
 
 def create_migration_app():
     """创建用于迁移的Flask应用"""
     app = Flask(__name__)
     app.config.from_object(config['development'])
-    db.init_app(app)
+    init_db(app)
     return app
 
 def init_database():
@@ -35,6 +40,11 @@ def init_database():
         # 创建所有表
         db.create_all()
         
+        # create_all 不会给已存在的表补建索引，逐个检查后创建
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        
         # 创建默认分类
         default_categories = [
             {'name': '工作', 'color': '#ff6b6b', 'description': '工作相关任务'},
@@ -44,13 +54,14 @@ def init_database():
             {'name': '娱乐', 'color': '#feca57', 'description': '娱乐休闲任务'}
         ]
         
-        for cat_data in default_categories:
-            
-            existing = Category.query.filter_by(name=cat_data['name']).first()
-            if not existing:
-                category = Category(**cat_data)
-                db.session.add(category)
-                print(f"✅ 创建默认分类: {cat_data['name']}")
+        # 单条 INSERT ... ON CONFLICT DO NOTHING，已存在的名称由唯一约束跳过，RETURNING 只返回新插入的行
+        created = db.session.execute(
+            sqlite_insert(Category).values(default_categories)
+            .on_conflict_do_nothing(index_elements=['name'])
+            .returning(Category.name)
+        ).scalars().all()
+        for name in created:
+            print(f"✅ 创建默认分类: {name}")
         
         # 创建默认标签
         default_tags = [
@@ -61,12 +72,13 @@ def init_database():
             {'name': '会议', 'color': '#ff6348'}
         ]
         
-        for tag_data in default_tags:
-            existing = Tag.query.filter_by(name=tag_data['name']).first()
-            if not existing:
-                tag = Tag(**tag_data)
-                db.session.add(tag)
-                print(f"✅ 创建默认标签: {tag_data['name']}")
+        created = db.session.execute(
+            sqlite_insert(Tag).values(default_tags)
+            .on_conflict_do_nothing(index_elements=['name'])
+            .returning(Tag.name)
+        ).scalars().all()
+        for name in created:
+            print(f"✅ 创建默认标签: {name}")
         
         # 提交更改
         db.session.commit()
@@ -101,11 +113,28 @@ def migrate_database():
         except Exception as e:
             print(f"⚠️  应用迁移失败: {e}")
 
+def _sqlite_backup(src_path, dst_path):
+    """使用SQLite在线备份API复制数据库，写事务进行中也能得到一致的副本"""
+    src = sqlite3.connect(src_path)
+    dst = sqlite3.connect(dst_path)
+    try:
+        with dst:
+            # 分批复制页面，批次之间让出锁，不长时间阻塞其他读写
+            src.backup(dst, pages=1000, sleep=0.01)
+    finally:
+        src.close()
+        dst.close()
+
+def _gzip_file(path):
+    """流式压缩文件并删除原文件，返回压缩后的路径"""
+    gz_path = path + '.gz'
+    with open(path, 'rb') as f_in, gzip.open(gz_path, 'wb', compresslevel=1) as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(path)
+    return gz_path
+
 def backup_database():
     """备份数据库"""
-    import shutil
-    from datetime import datetime
-    
     backup_dir = 'backups'
     if not os.path.exists(backup_dir):
         os.makedirs(backup_dir)
@@ -114,15 +143,14 @@ def backup_database():
     backup_file = os.path.join(backup_dir, f'todo_backup_{timestamp}.db')
     
     if os.path.exists('todo.db'):
-        shutil.copy2('todo.db', backup_file)
+        _sqlite_backup('todo.db', backup_file)
+        backup_file = _gzip_file(backup_file)
         print(f"✅ 数据库备份完成: {backup_file}")
     else:
         print("⚠️  数据库文件不存在，跳过备份")
 
 def restore_database(backup_file):
-    """恢复数据库"""
-    import shutil
-    
+    """恢复数据库（支持 .db 与 .db.gz 备份文件）"""
     if not os.path.exists(backup_file):
         print(f"❌ 备份文件不存在: {backup_file}")
         return
@@ -131,11 +159,20 @@ def restore_database(backup_file):
     if os.path.exists('todo.db'):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         current_backup = f'todo_current_{timestamp}.db'
-        shutil.copy2('todo.db', current_backup)
+        _sqlite_backup('todo.db', current_backup)
         print(f"✅ 当前数据库已备份: {current_backup}")
     
-    # 恢复数据库
-    shutil.copy2(backup_file, 'todo.db')
+    # 恢复数据库：压缩的备份先解压到临时文件，再通过备份API写回
+    if backup_file.endswith('.gz'):
+        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as tmp, \
+                gzip.open(backup_file, 'rb') as f_in:
+            shutil.copyfileobj(f_in, tmp)
+        try:
+            _sqlite_backup(tmp.name, 'todo.db')
+        finally:
+            os.remove(tmp.name)
+    else:
+        _sqlite_backup(backup_file, 'todo.db')
     print(f"✅ 数据库恢复完成: {backup_file}")
 
 def show_database_info():
@@ -143,24 +180,25 @@ def show_database_info():
     app = create_migration_app()
     
     with app.app_context():
+        # 四个表的行数合并为一条语句查询
+        todo_total, category_total, tag_total, user_total = db.session.execute(db.text(
+            "SELECT (SELECT COUNT(*) FROM todos), (SELECT COUNT(*) FROM categories), "
+            "(SELECT COUNT(*) FROM tags), (SELECT COUNT(*) FROM users)"
+        )).one()
         print("📊 数据库信息:")
-        print(f"  任务总数: {Todo.query.count()}")
-        print(f"  分类总数: {Category.query.count()}")
-        print(f"  标签总数: {Tag.query.count()}")
-        print(f"  用户总数: {User.query.count()}")
+        print(f"  任务总数: {todo_total}")
+        print(f"  分类总数: {category_total}")
+        print(f"  标签总数: {tag_total}")
+        print(f"  用户总数: {user_total}")
         
         # 显示分类信息
         print("\n📁 分类信息:")
-        categories = Category.query.all()
-        for cat in categories:
-            todo_count = Todo.query.filter_by(category=cat.name).count()
+        for cat, todo_count in Category.list_with_counts():
             print(f"  {cat.name}: {todo_count} 个任务")
         
         # 显示标签信息
         print("\n🏷️  标签信息:")
-        tags = Tag.query.all()
-        for tag in tags:
-            todo_count = TodoTag.query.filter_by(tag_id=tag.id).count()
+        for tag, todo_count in Tag.list_with_counts():
             print(f"  {tag.name}: {todo_count} 个任务")
 
 def clear_database():
@@ -226,15 +264,18 @@ def create_sample_data():
             }
         ]
         
+        # 一条 executemany 批量插入所有示例任务
+        db.session.execute(db.insert(Todo), [
+            {
+                'content': todo_data['content'],
+                'priority': todo_data['priority'],
+                'category': todo_data['category'],
+                'notes': todo_data['notes'],
+                'tags': ','.join(todo_data['tags'])
+            }
+            for todo_data in sample_todos
+        ])
         for todo_data in sample_todos:
-            todo = Todo(
-                content=todo_data['content'],
-                priority=todo_data['priority'],
-                category=todo_data['category'],
-                notes=todo_data['notes'],
-                tags=','.join(todo_data['tags'])
-            )
-            db.session.add(todo)
             print(f"✅ 创建示例任务: {todo_data['content']}")
         
         db.session.commit()
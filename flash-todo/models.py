@@ -1,16 +1,53 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import func, case, literal_column
+from sqlalchemy.types import TypeDecorator, String
 from sqlalchemy.ext.hybrid import hybrid_property
 import enum
+from sys import intern
+
+from core import register_sqlite_pragmas
 
 db = SQLAlchemy()
 
+# 序列化时直接调用未绑定方法，省去每次的属性查找
+_isoformat = datetime.isoformat
+
+def init_db(app):
+    """把 db 绑定到应用，并让该应用引擎的SQLite连接开启WAL等性能相关设置，读请求不再被写事务阻塞"""
+    db.init_app(app)
+    with app.app_context():
+        register_sqlite_pragmas(db.engine)
+
+class InternedString(TypeDecorator):
+    """读取时驻留（intern）字符串的String列
+    
+    取值只有少数几种的列（优先级、分类名）驻留后，所有相同取值是同一个对象，
+    过滤和排序时的字符串比较在身份检查处即可返回
+    """
+    impl = String
+    cache_ok = True
+    
+    def process_result_value(self, value, dialect):
+        return intern(value) if value is not None else None
+
 class Priority(enum.Enum):
     """任务优先级枚举"""
     LOW = 'low'
     MEDIUM = 'medium'
     HIGH = 'high'
 
+# 优先级排序值（high → medium → low）
+PRIORITY_RANK = {Priority.HIGH.value: 1, Priority.MEDIUM.value: 2, Priority.LOW.value: 3}
+
+def priority_rank_expression(priority_column):
+    """优先级排序值的SQL CASE表达式
+    
+    取值以字面量写入SQL，查询中的表达式与表达式索引文本一致，SQLite才能直接按索引顺序读取
+    """
+    return case({literal_column(f"'{name}'"): literal_column(str(rank)) for name, rank in PRIORITY_RANK.items()},
+                value=priority_column, else_=literal_column(str(len(PRIORITY_RANK) + 1)))
+
 class Todo(db.Model):
     """Todo任务模型"""
     __tablename__ = 'todos'
@@ -18,19 +55,41 @@ class Todo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     completed = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     completed_at = db.Column(db.DateTime, nullable=True)
-    priority = db.Column(db.String(10), default=Priority.MEDIUM.value)
+    priority = db.Column(InternedString(10), default=Priority.MEDIUM.value, index=True)
     due_date = db.Column(db.DateTime, nullable=True)
     tags = db.Column(db.Text, nullable=True)  # 存储为JSON字符串
     notes = db.Column(db.Text, nullable=True)
-    category = db.Column(db.String(50), nullable=True)
+    category = db.Column(InternedString(50), nullable=True, index=True)
     estimated_time = db.Column(db.Integer, nullable=True)  # 预估时间（分钟）
     actual_time = db.Column(db.Integer, nullable=True)  # 实际用时（分钟）
     
+    # 所属分类随任务一起JOIN加载，遍历任务列表访问分类时不会逐行查询
+    category_obj = db.relationship('Category', primaryjoin='foreign(Todo.category) == Category.name',
+                                   back_populates='todos', lazy='joined')
+    
+    # 按完成状态过滤并按创建时间排序；completed 单列查询也可使用该索引的前缀
+    # 默认列表排序 (completed, priority_rank, created_at) 直接按表达式索引顺序读取，无需额外排序
+    # 逾期查询按 due_date 范围扫描，completed 在索引内判断，不必回表
+    __table_args__ = (
+        db.Index('ix_todos_completed_created', 'completed', 'created_at'),
+        db.Index('ix_todos_completed_rank_created', completed, priority_rank_expression(priority), created_at),
+        db.Index('ix_todos_due_completed', 'due_date', 'completed'),
+    )
+    
     def __repr__(self):
         return f'<Todo {self.id}: {self.content[:50]}>'
     
+    @hybrid_property
+    def priority_rank(self):
+        """优先级排序值，未知优先级排在最后"""
+        return PRIORITY_RANK.get(self.priority, len(PRIORITY_RANK) + 1)
+    
+    @priority_rank.expression
+    def priority_rank(cls):
+        return priority_rank_expression(cls.priority)
+    
     @hybrid_property
     def is_overdue(self):
         """检查任务是否逾期"""
@@ -64,25 +123,40 @@ class Todo(db.Model):
         self.completed = False
         self.completed_at = None
     
-    def to_dict(self):
-        """转换为字典格式"""
+    @staticmethod
+    def row_to_dict(row, now=None):
+        """把模型对象或Core查询行转换为字典，派生字段基于同一个当前时间只计算一次
+        
+        批量序列化时由调用方传入同一个 now，避免每行都取一次当前时间
+        """
+        if now is None:
+            now = datetime.utcnow()
+        # 只有未完成且设置了截止日期的任务才有逾期/剩余天数
+        pending_due = row.due_date if row.due_date and not row.completed else None
+        completion_time = None
+        if row.completed and row.completed_at and row.created_at:
+            completion_time = int((row.completed_at - row.created_at).total_seconds() / 60)
         return {
-            'id': self.id,
-            'content': self.content,
-            'completed': self.completed,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'priority': self.priority,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'tags': self.tags,
-            'notes': self.notes,
-            'category': self.category,
-            'estimated_time': self.estimated_time,
-            'actual_time': self.actual_time,
-            'is_overdue': self.is_overdue,
-            'days_until_due': self.days_until_due,
-            'completion_time': self.completion_time
+            'id': row.id,
+            'content': row.content,
+            'completed': row.completed,
+            'created_at': _isoformat(row.created_at) if row.created_at else None,
+            'completed_at': _isoformat(row.completed_at) if row.completed_at else None,
+            'priority': row.priority,
+            'due_date': _isoformat(row.due_date) if row.due_date else None,
+            'tags': row.tags,
+            'notes': row.notes,
+            'category': row.category,
+            'estimated_time': row.estimated_time,
+            'actual_time': row.actual_time,
+            'is_overdue': pending_due is not None and now > pending_due,
+            'days_until_due': (pending_due - now).days if pending_due else None,
+            'completion_time': completion_time
         }
+    
+    def to_dict(self, now=None):
+        """转换为字典格式"""
+        return Todo.row_to_dict(self, now)
 
 class Category(db.Model):
     """任务分类模型"""
@@ -94,19 +168,38 @@ class Category(db.Model):
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # 关联关系
-    todos = db.relationship('Todo', backref='category_obj', lazy='dynamic')
+    # 关联关系（任务通过分类名称关联，没有外键，需显式给出连接条件）
+    # 批量遍历时配合 selectinload(Category.todos) 一次加载所有分类的任务
+    todos = db.relationship('Todo', primaryjoin='foreign(Todo.category) == Category.name',
+                            back_populates='category_obj', lazy='select')
     
     def __repr__(self):
         return f'<Category {self.name}>'
     
-    def to_dict(self):
+    def todo_count(self):
+        """该分类下的任务数（COUNT查询，不加载任务对象）"""
+        return db.session.query(func.count(Todo.id)).filter(Todo.category == self.name).scalar()
+    
+    def in_use(self):
+        """是否有任务使用该分类（EXISTS查询，找到一行即返回）"""
+        return db.session.query(Todo.query.filter(Todo.category == self.name).exists()).scalar()
+    
+    @classmethod
+    def list_with_counts(cls):
+        """一次分组查询返回所有分类及其任务数 [(category, todo_count), ...]"""
+        return (db.session.query(cls, func.count(Todo.id))
+                .outerjoin(Todo, Todo.category == cls.name)
+                .group_by(cls.id)
+                .all())
+    
+    def to_dict(self, todo_count=None):
+        """todo_count 已知时（如来自 list_with_counts）直接使用，避免逐个COUNT查询"""
         return {
             'id': self.id,
             'name': self.name,
             'color': self.color,
             'description': self.description,
-            'todo_count': self.todos.count()
+            'todo_count': self.todo_count() if todo_count is None else todo_count
         }
 
 class Tag(db.Model):
@@ -121,6 +214,18 @@ class Tag(db.Model):
     def __repr__(self):
         return f'<Tag {self.name}>'
     
+    def in_use(self):
+        """是否有任务使用该标签（EXISTS查询，找到一行即返回）"""
+        return db.session.query(TodoTag.query.filter(TodoTag.tag_id == self.id).exists()).scalar()
+    
+    @classmethod
+    def list_with_counts(cls):
+        """一次分组查询返回所有标签及其任务数 [(tag, todo_count), ...]"""
+        return (db.session.query(cls, func.count(TodoTag.id))
+                .outerjoin(TodoTag, TodoTag.tag_id == cls.id)
+                .group_by(cls.id)
+                .all())
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -134,7 +239,8 @@ class TodoTag(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     todo_id = db.Column(db.Integer, db.ForeignKey('todos.id'), nullable=False)
-    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), nullable=False)
+    # todo_id 已是唯一约束 _todo_tag_uc 的前导列，只需为 tag_id 单独建索引
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), nullable=False, index=True)
     
     # 关联关系
     todo = db.relationship('Todo', backref=db.backref('todo_tags', lazy='dynamic'))
@@ -1,91 +1,265 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 from models import db, Todo, Category, Tag, TodoTag
-from utils import ValidationUtils, DataUtils, DateTimeUtils, ErrorHandler
+from utils import ValidationUtils, DateTimeUtils, ErrorHandler, TodoStats
 import json
 import logging
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from sqlalchemy import func, update
+from sqlalchemy.orm import defer
 
 logger = logging.getLogger(__name__)
 
+# 分类/标签快照和任务统计的有效期（秒）。每个进程各自缓存，其他worker的修改最多延迟这么久可见
+LOOKUP_TTL = 60
+
+# 流式输出任务列表时每批从数据库读取的行数
+STREAM_BATCH_SIZE = 200
+
+def _ttl_bucket() -> int:
+    """当前所处的缓存时间段，时间段变化时 maxsize=1 的缓存自然失效"""
+    return int(time.time() // LOOKUP_TTL)
+
+@lru_cache(maxsize=1)
+def _all_categories(bucket: int) -> tuple:
+    """所有分类的只读快照（元组+字典，可在线程间共享）"""
+    return tuple(
+        {'id': c.id, 'name': c.name, 'color': c.color, 'description': c.description}
+        for c in Category.query.all()
+    )
+
+@lru_cache(maxsize=1)
+def _all_tags(bucket: int) -> tuple:
+    """所有标签的只读快照"""
+    return tuple(tag.to_dict() for tag in Tag.query.all())
+
+@lru_cache(maxsize=1024)
+def _encode_tags(tags: tuple) -> str:
+    """标签列表的JSON编码（常用标签组合反复出现，相同组合只编码一次）"""
+    return json.dumps(list(tags))
+
+def _tags_json(tags) -> Optional[str]:
+    """把请求中的标签转换为 tags 列存储的JSON字符串，空标签存为 None"""
+    if not tags:
+        return None
+    # 只缓存全是字符串的标签列表：1、True、1.0 作为缓存键是相等的，混用会返回别的值的编码
+    if isinstance(tags, (list, tuple)) and all(type(tag) is str for tag in tags):
+        return _encode_tags(tuple(tags))
+    return json.dumps(tags)
+
+@lru_cache(maxsize=1)
+def _todo_stats(bucket: int) -> TodoStats:
+    """任务统计结果（本进程内的任务写操作会清空缓存）"""
+    return TodoService.compute_stats()
+
+def clear_caches() -> None:
+    """清空本进程内的分类/标签快照和任务统计缓存（切换数据库时使用，例如测试之间）"""
+    _all_categories.cache_clear()
+    _all_tags.cache_clear()
+    _todo_stats.cache_clear()
+
+def _after_commit(callback) -> None:
+    """登记在最外层事务提交成功后执行的回调（如清空进程内缓存），回滚时丢弃"""
+    db.session.info.setdefault('after_commit', []).append(callback)
+
+@contextmanager
+def transaction():
+    """服务层事务：最外层负责提交或回滚，嵌套的服务调用并入外层事务
+    
+    多个服务调用可以放在同一个 with transaction(): 中，只提交（fsync）一次
+    """
+    session = db.session
+    depth = session.info.get('tx_depth', 0)
+    session.info['tx_depth'] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+    except BaseException:
+        if depth == 0:
+            session.rollback()
+            session.info.pop('after_commit', None)
+        raise
+    finally:
+        session.info['tx_depth'] = depth
+    
+    if depth == 0:
+        for callback in session.info.pop('after_commit', ()):
+            callback()
+
+def transactional(fn):
+    """把服务方法放进 transaction() 中执行"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with transaction():
+            return fn(*args, **kwargs)
+    return wrapper
+
 class TodoService:
     """Todo任务服务类"""
     
     @staticmethod
-    def get_all_todos(filters: Dict[str, Any] = None, sort_by: str = 'priority', order: str = 'asc') -> List[Todo]:
-        """获取所有任务"""
+    def _todo_query(filters: Dict[str, Any] = None, sort_by: str = 'priority', order: str = 'asc',
+                    summary: bool = False):
+        """按过滤和排序条件构造任务查询"""
+        query = Todo.query
+        if summary:
+            query = query.options(defer(Todo.notes), defer(Todo.tags))
+        
+        # 应用过滤器
+        if filters:
+            if 'completed' in filters:
+                query = query.filter(Todo.completed == filters['completed'])
+            if 'priority' in filters:
+                query = query.filter(Todo.priority == filters['priority'])
+            if 'category' in filters:
+                query = query.filter(Todo.category == filters['category'])
+            if 'overdue' in filters and filters['overdue']:
+                # 当前时间作为绑定参数传入，语句文本不变，可复用SQLAlchemy的编译缓存
+                now = datetime.utcnow()
+                query = query.filter(Todo.due_date < now, Todo.completed.is_(False))
+        
+        # 应用排序
+        if sort_by == 'priority':
+            # 按 high → medium → low 排序（直接按列排序会得到字母顺序 high, low, medium）
+            query = query.order_by(Todo.completed.asc(), Todo.priority_rank.asc(), Todo.created_at.asc())
+        elif sort_by == 'created_at':
+            query = query.order_by(Todo.created_at.desc() if order == 'desc' else Todo.created_at.asc())
+        elif sort_by == 'due_date':
+            query = query.order_by(Todo.due_date.asc() if order == 'asc' else Todo.due_date.desc())
+        
+        return query
+    
+    @staticmethod
+    def get_all_todos(filters: Dict[str, Any] = None, sort_by: str = 'priority', order: str = 'asc',
+                      summary: bool = False) -> List[Todo]:
+        """获取所有任务
+        
+        summary=True 用于列表页：不查询备注和标签这两个大文本列，需要完整数据时用 get_todo_by_id
+        """
         try:
-            query = Todo.query
-            
-            # 应用过滤器
-            if filters:
-                if 'completed' in filters:
-                    query = query.filter(Todo.completed == filters['completed'])
-                if 'priority' in filters:
-                    query = query.filter(Todo.priority == filters['priority'])
-                if 'category' in filters:
-                    query = query.filter(Todo.category == filters['category'])
-                if 'overdue' in filters and filters['overdue']:
-                    query = query.filter(Todo.due_date < datetime.utcnow(), Todo.completed == False)
-            
-            # 应用排序
-            if sort_by == 'priority':
-                priority_order = {'high': 1, 'medium': 2, 'low': 3}
-                query = query.order_by(Todo.completed.asc(), Todo.priority.asc(), Todo.created_at.asc())
-            elif sort_by == 'created_at':
-                query = query.order_by(Todo.created_at.desc() if order == 'desc' else Todo.created_at.asc())
-            elif sort_by == 'due_date':
-                query = query.order_by(Todo.due_date.asc() if order == 'asc' else Todo.due_date.desc())
-            
-            todos = query.all()
-            return todos
+            return TodoService._todo_query(filters, sort_by, order, summary).all()
+        except Exception as e:
+            logger.error("获取任务列表失败: %s", e)
+            raise
+    
+    @staticmethod
+    def iter_todos(filters: Dict[str, Any] = None, sort_by: str = 'priority', order: str = 'asc',
+                   batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Todo]:
+        """逐批读取任务，内存中最多保留 batch_size 个任务对象
+        
+        查询在调用时立即执行（出错时在这里抛出），返回的迭代器需在同一应用上下文中消费完
+        """
+        try:
+            return iter(TodoService._todo_query(filters, sort_by, order).yield_per(batch_size))
         except Exception as e:
-            logger.error(f"获取任务列表失败: {e}")
+            logger.error("获取任务列表失败: %s", e)
             raise
     
     @staticmethod
     def get_todo_by_id(todo_id: int) -> Optional[Todo]:
         """根据ID获取任务"""
         try:
-            return Todo.query.get(todo_id)
+            return db.session.get(Todo, todo_id)
         except Exception as e:
-            logger.error(f"获取任务失败: {e}")
+            logger.error("获取任务失败: %s", e)
             raise
     
     @staticmethod
+    def _build_todo(data: Dict[str, Any]) -> Todo:
+        """校验数据并构造任务对象（不写入数据库）"""
+        # 验证数据
+        content_validation = ValidationUtils.validate_todo_content(data.get('content', ''))
+        if not content_validation['valid']:
+            raise ValueError(content_validation['error'])
+        
+        priority_validation = ValidationUtils.validate_priority(data.get('priority', 'medium'))
+        if not priority_validation['valid']:
+            raise ValueError(priority_validation['error'])
+        
+        # 创建任务
+        return Todo(
+            content=content_validation['content'],
+            priority=priority_validation['priority'],
+            due_date=DateTimeUtils.parse_datetime(data.get('due_date')) if data.get('due_date') else None,
+            notes=ValidationUtils.sanitize_input(data.get('notes', '')),
+            category=data.get('category'),
+            estimated_time=data.get('estimated_time'),
+            tags=_tags_json(data.get('tags'))
+        )
+    
+    @staticmethod
+    @transactional
     def create_todo(data: Dict[str, Any]) -> Todo:
         """创建新任务"""
         try:
-            # 验证数据
-            content_validation = ValidationUtils.validate_todo_content(data.get('content', ''))
-            if not content_validation['valid']:
-                raise ValueError(content_validation['error'])
-            
-            priority_validation = ValidationUtils.validate_priority(data.get('priority', 'medium'))
-            if not priority_validation['valid']:
-                raise ValueError(priority_validation['error'])
-            
-            # 创建任务
-            todo = Todo(
-                content=content_validation['content'],
-                priority=priority_validation['priority'],
-                due_date=DateTimeUtils.parse_datetime(data.get('due_date')) if data.get('due_date') else None,
-                notes=ValidationUtils.sanitize_input(data.get('notes', '')),
-                category=data.get('category'),
-                estimated_time=data.get('estimated_time'),
-                tags=json.dumps(data.get('tags', [])) if data.get('tags') else None
-            )
+            todo = TodoService._build_todo(data)
             
             db.session.add(todo)
-            db.session.commit()
+            db.session.flush()  # 分配主键
+            _after_commit(_todo_stats.cache_clear)
             
-            logger.info(f"创建任务成功: {todo.id}")
+            logger.info("创建任务成功: %s", todo.id)
             return todo
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"创建任务失败: {e}")
+            logger.error("创建任务失败: %s", e)
+            raise
+    
+    @staticmethod
+    @transactional
+    def bulk_create(items: List[Dict[str, Any]]) -> List[Todo]:
+        """批量创建任务（全部校验通过后一次插入，与其他写操作在同一事务中提交）"""
+        try:
+            todos = [TodoService._build_todo(data) for data in items]
+            
+            # 所有行在同一个事务中插入；与 bulk_save_objects 不同，flush 时会回填主键和默认值
+            db.session.add_all(todos)
+            db.session.flush()
+            _after_commit(_todo_stats.cache_clear)
+            
+            logger.info("批量创建任务成功: %s个任务", len(todos))
+            return todos
+        except Exception as e:
+            logger.error("批量创建任务失败: %s", e)
             raise
     
     @staticmethod
+    def _validated_updates(data: Dict[str, Any]) -> Dict[str, Any]:
+        """校验并清洗更新数据，返回 {列名: 值} 映射（单个更新和批量更新共用）"""
+        updates = {}
+        if 'content' in data:
+            content_validation = ValidationUtils.validate_todo_content(data['content'])
+            if not content_validation['valid']:
+                raise ValueError(content_validation['error'])
+            updates['content'] = content_validation['content']
+        
+        if 'priority' in data:
+            priority_validation = ValidationUtils.validate_priority(data['priority'])
+            if not priority_validation['valid']:
+                raise ValueError(priority_validation['error'])
+            updates['priority'] = priority_validation['priority']
+        
+        if 'due_date' in data:
+            updates['due_date'] = DateTimeUtils.parse_datetime(data['due_date']) if data['due_date'] else None
+        
+        if 'notes' in data:
+            updates['notes'] = ValidationUtils.sanitize_input(data['notes'])
+        
+        if 'category' in data:
+            updates['category'] = data['category']
+        
+        if 'estimated_time' in data:
+            updates['estimated_time'] = data['estimated_time']
+        
+        if 'tags' in data:
+            updates['tags'] = _tags_json(data['tags'])
+        
+        return updates
+    
+    @staticmethod
+    @transactional
     def update_todo(todo_id: int, data: Dict[str, Any]) -> Todo:
         """更新任务"""
         try:
@@ -94,43 +268,19 @@ class TodoService:
                 raise ValueError("任务不存在")
             
             # 验证数据
-            if 'content' in data:
-                content_validation = ValidationUtils.validate_todo_content(data['content'])
-                if not content_validation['valid']:
-                    raise ValueError(content_validation['error'])
-                todo.content = content_validation['content']
-            
-            if 'priority' in data:
-                priority_validation = ValidationUtils.validate_priority(data['priority'])
-                if not priority_validation['valid']:
-                    raise ValueError(priority_validation['error'])
-                todo.priority = priority_validation['priority']
-            
-            if 'due_date' in data:
-                todo.due_date = DateTimeUtils.parse_datetime(data['due_date']) if data['due_date'] else None
-            
-            if 'notes' in data:
-                todo.notes = ValidationUtils.sanitize_input(data['notes'])
-            
-            if 'category' in data:
-                todo.category = data['category']
+            for column, value in TodoService._validated_updates(data).items():
+                setattr(todo, column, value)
             
-            if 'estimated_time' in data:
-                todo.estimated_time = data['estimated_time']
+            _after_commit(_todo_stats.cache_clear)
             
-            if 'tags' in data:
-                todo.tags = json.dumps(data['tags']) if data['tags'] else None
-            
-            db.session.commit()
-            
-            logger.info(f"更新任务成功: {todo_id}")
+            logger.info("更新任务成功: %s", todo_id)
             return todo
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"更新任务失败: {e}")
+            logger.error("更新任务失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def delete_todo(todo_id: int) -> bool:
         """删除任务"""
         try:
@@ -139,87 +289,145 @@ class TodoService:
                 raise ValueError("任务不存在")
             
             db.session.delete(todo)
-            db.session.commit()
+            _after_commit(_todo_stats.cache_clear)
             
-            logger.info(f"删除任务成功: {todo_id}")
+            logger.info("删除任务成功: %s", todo_id)
             return True
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"删除任务失败: {e}")
+            logger.error("删除任务失败: %s", e)
             raise
     
     @staticmethod
+    def _set_completed(todo_id: int, completed: bool) -> Todo:
+        """用一条 UPDATE ... RETURNING 修改完成状态并取回任务，不需要先查询"""
+        todo = db.session.execute(
+            update(Todo)
+            .where(Todo.id == todo_id)
+            .values(completed=completed, completed_at=datetime.utcnow() if completed else None)
+            .returning(Todo)
+        ).scalar_one_or_none()
+        if todo is None:
+            raise ValueError("任务不存在")
+        
+        _after_commit(_todo_stats.cache_clear)
+        return todo
+    
+    @staticmethod
+    @transactional
     def mark_completed(todo_id: int) -> Todo:
         """标记任务为完成"""
         try:
-            todo = TodoService.get_todo_by_id(todo_id)
-            if not todo:
-                raise ValueError("任务不存在")
-            
-            todo.mark_completed()
-            db.session.commit()
+            todo = TodoService._set_completed(todo_id, True)
             
-            logger.info(f"标记任务完成: {todo_id}")
+            logger.info("标记任务完成: %s", todo_id)
             return todo
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"标记任务完成失败: {e}")
+            logger.error("标记任务完成失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def mark_incomplete(todo_id: int) -> Todo:
         """标记任务为未完成"""
         try:
-            todo = TodoService.get_todo_by_id(todo_id)
-            if not todo:
-                raise ValueError("任务不存在")
-            
-            todo.mark_incomplete()
-            db.session.commit()
+            todo = TodoService._set_completed(todo_id, False)
             
-            logger.info(f"标记任务未完成: {todo_id}")
+            logger.info("标记任务未完成: %s", todo_id)
             return todo
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"标记任务未完成失败: {e}")
+            logger.error("标记任务未完成失败: %s", e)
+            raise
+    
+    @staticmethod
+    def get_stats() -> TodoStats:
+        """获取统计信息（按时间段缓存，返回的 TodoStats 不可变，可直接共享）"""
+        try:
+            return _todo_stats(_ttl_bucket())
+        except Exception as e:
+            logger.error("获取统计信息失败: %s", e)
             raise
     
     @staticmethod
-    def get_stats() -> Dict[str, Any]:
-        """获取统计信息"""
+    def compute_stats() -> TodoStats:
+        """从数据库计算统计信息"""
         try:
-            todos = TodoService.get_all_todos()
-            return DataUtils.calculate_stats(todos)
+            # 按(完成状态, 优先级)分组计数，结果最多六行，不加载任务对象
+            grouped = db.session.query(Todo.completed, Todo.priority, func.count(Todo.id)) \
+                .group_by(Todo.completed, Todo.priority).all()
+            
+            total = completed = 0
+            priority_stats = {'high': 0, 'medium': 0, 'low': 0}
+            for is_completed, priority, count in grouped:
+                total += count
+                if is_completed:
+                    completed += count
+                if priority in priority_stats:
+                    priority_stats[priority] += count
+            
+            # 逾期和今日新建的任务数用一条条件聚合查询得到
+            now = datetime.utcnow()
+            today_start = datetime.combine(now.date(), datetime.min.time())
+            overdue, today_todos = db.session.query(
+                func.count(Todo.id).filter(Todo.due_date < now, Todo.completed.is_(False)),
+                func.count(Todo.id).filter(Todo.created_at >= today_start)
+            ).one()
+            
+            return TodoStats.from_counts(total, completed, priority_stats['high'], priority_stats['medium'],
+                                         priority_stats['low'], overdue, today_todos)
         except Exception as e:
-            logger.error(f"获取统计信息失败: {e}")
+            logger.error("获取统计信息失败: %s", e)
             raise
     
     @staticmethod
+    def _require_existing(todo_ids: set) -> None:
+        """一次查询确认所有任务都存在，有缺失时在写入前报错"""
+        found = {todo_id for todo_id, in db.session.query(Todo.id).filter(Todo.id.in_(todo_ids))}
+        missing = todo_ids - found
+        if missing:
+            raise ValueError(f"任务不存在: {', '.join(map(str, sorted(missing)))}")
+    
+    @staticmethod
+    @transactional
     def bulk_update(todo_ids: List[int], updates: Dict[str, Any]) -> List[Todo]:
-        """批量更新任务"""
+        """批量更新任务（一条UPDATE语句）"""
         try:
-            todos = []
-            for todo_id in todo_ids:
-                todo = TodoService.update_todo(todo_id, updates)
-                todos.append(todo)
-            
-            logger.info(f"批量更新任务成功: {len(todo_ids)}个任务")
+            todo_ids = set(todo_ids)
+            # 更新数据只校验一次，所有任务写入相同的值
+            mapping = TodoService._validated_updates(updates)
+            TodoService._require_existing(todo_ids)
+            if mapping:
+                updated = Todo.query.filter(Todo.id.in_(todo_ids)).update(mapping, synchronize_session=False)
+                if updated != len(todo_ids):  # 检查之后被并发删除
+                    raise ValueError("任务不存在")
+                _after_commit(_todo_stats.cache_clear)
+            
+            # UPDATE 没有同步会话中的对象，重新查询时用数据库中的值覆盖
+            todos = Todo.query.filter(Todo.id.in_(todo_ids)).execution_options(populate_existing=True).all()
+            
+            logger.info("批量更新任务成功: %s个任务", len(todo_ids))
             return todos
         except Exception as e:
-            logger.error(f"批量更新任务失败: {e}")
+            logger.error("批量更新任务失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def bulk_delete(todo_ids: List[int]) -> bool:
-        """批量删除任务"""
+        """批量删除任务（一条DELETE语句）"""
         try:
-            for todo_id in todo_ids:
-                TodoService.delete_todo(todo_id)
+            todo_ids = set(todo_ids)
+            TodoService._require_existing(todo_ids)
+            # 先删除标签关联，避免留下指向已删除任务的记录
+            TodoTag.query.filter(TodoTag.todo_id.in_(todo_ids)).delete(synchronize_session=False)
+            deleted = Todo.query.filter(Todo.id.in_(todo_ids)).delete(synchronize_session=False)
+            if deleted != len(todo_ids):  # 检查之后被并发删除
+                raise ValueError("任务不存在")
+            _after_commit(_todo_stats.cache_clear)
             
-            logger.info(f"批量删除任务成功: {len(todo_ids)}个任务")
+            logger.info("批量删除任务成功: %s个任务", len(todo_ids))
             return True
         except Exception as e:
-            logger.error(f"批量删除任务失败: {e}")
+            logger.error("批量删除任务失败: %s", e)
             raise
 
 class CategoryService:
@@ -231,10 +439,25 @@ class CategoryService:
         try:
             return Category.query.all()
         except Exception as e:
-            logger.error(f"获取分类列表失败: {e}")
+            logger.error("获取分类列表失败: %s", e)
+            raise
+    
+    @staticmethod
+    def get_category_snapshot() -> tuple:
+        """获取缓存的分类列表（只读），用于页面渲染等只需展示的场景"""
+        return _all_categories(_ttl_bucket())
+    
+    @staticmethod
+    def get_categories_with_counts() -> List[tuple]:
+        """获取所有分类及各自的任务数"""
+        try:
+            return Category.list_with_counts()
+        except Exception as e:
+            logger.error("获取分类列表失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def create_category(name: str, color: str = '#667eea', description: str = None) -> Category:
         """创建分类"""
         try:
@@ -253,20 +476,21 @@ class CategoryService:
             )
             
             db.session.add(category)
-            db.session.commit()
+            db.session.flush()  # 分配主键
+            _after_commit(_all_categories.cache_clear)
             
-            logger.info(f"创建分类成功: {category.id}")
+            logger.info("创建分类成功: %s", category.id)
             return category
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"创建分类失败: {e}")
+            logger.error("创建分类失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def update_category(category_id: int, data: Dict[str, Any]) -> Category:
         """更新分类"""
         try:
-            category = Category.query.get(category_id)
+            category = db.session.get(Category, category_id)
             if not category:
                 raise ValueError("分类不存在")
             
@@ -281,35 +505,34 @@ class CategoryService:
             if 'description' in data:
                 category.description = data['description']
             
-            db.session.commit()
+            _after_commit(_all_categories.cache_clear)
             
-            logger.info(f"更新分类成功: {category_id}")
+            logger.info("更新分类成功: %s", category_id)
             return category
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"更新分类失败: {e}")
+            logger.error("更新分类失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def delete_category(category_id: int) -> bool:
         """删除分类"""
         try:
-            category = Category.query.get(category_id)
+            category = db.session.get(Category, category_id)
             if not category:
                 raise ValueError("分类不存在")
             
             # 检查是否有任务使用此分类
-            if category.todos.count() > 0:
+            if category.in_use():
                 raise ValueError("无法删除正在使用的分类")
             
             db.session.delete(category)
-            db.session.commit()
+            _after_commit(_all_categories.cache_clear)
             
-            logger.info(f"删除分类成功: {category_id}")
+            logger.info("删除分类成功: %s", category_id)
             return True
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"删除分类失败: {e}")
+            logger.error("删除分类失败: %s", e)
             raise
 
 class TagService:
@@ -321,10 +544,16 @@ class TagService:
         try:
             return Tag.query.all()
         except Exception as e:
-            logger.error(f"获取标签列表失败: {e}")
+            logger.error("获取标签列表失败: %s", e)
             raise
     
     @staticmethod
+    def get_tag_snapshot() -> tuple:
+        """获取缓存的标签列表（只读）"""
+        return _all_tags(_ttl_bucket())
+    
+    @staticmethod
+    @transactional
     def create_tag(name: str, color: str = '#6c757d') -> Tag:
         """创建标签"""
         try:
@@ -342,33 +571,33 @@ class TagService:
             )
             
             db.session.add(tag)
-            db.session.commit()
+            db.session.flush()  # 分配主键
+            _after_commit(_all_tags.cache_clear)
             
-            logger.info(f"创建标签成功: {tag.id}")
+            logger.info("创建标签成功: %s", tag.id)
             return tag
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"创建标签失败: {e}")
+            logger.error("创建标签失败: %s", e)
             raise
     
     @staticmethod
+    @transactional
     def delete_tag(tag_id: int) -> bool:
         """删除标签"""
         try:
-            tag = Tag.query.get(tag_id)
+            tag = db.session.get(Tag, tag_id)
             if not tag:
                 raise ValueError("标签不存在")
             
             # 检查是否有任务使用此标签
-            if tag.todo_tags.count() > 0:
+            if tag.in_use():
                 raise ValueError("无法删除正在使用的标签")
             
             db.session.delete(tag)
-            db.session.commit()
+            _after_commit(_all_tags.cache_clear)
             
-            logger.info(f"删除标签成功: {tag_id}")
+            logger.info("删除标签成功: %s", tag_id)
             return True
         except Exception as e:
-            db.session.rollback()
-            logger.error(f"删除标签失败: {e}")
+            logger.error("删除标签失败: %s", e)
             raise 
\ No newline at end of file
@@ -3,28 +3,27 @@
 Flash Todo 应用测试文件
 """
 
-import unittest
-import tempfile
 import os
+import sys
+import tempfile
+import threading
+import unittest
+import importlib.util
 import json
 from datetime import datetime, timedelta
 
 from app_new import create_app
-from models import db, Todo, Category, Tag
-from services import TodoService, CategoryService, TagService
-from utils import ValidationUtils, DateTimeUtils, DataUtils
+from models import db, Todo, Category, Tag, TodoTag
+from services import TodoService, CategoryService, TagService, transaction, clear_caches, _tags_json, STREAM_BATCH_SIZE
+from utils import ValidationUtils, DateTimeUtils, DataUtils, format_datetime, get_relative_time
 
 class TodoTestCase(unittest.TestCase):
     """Todo应用测试用例"""
     
     def setUp(self):
         """测试前准备"""
-        # 创建临时数据库
-        self.db_fd, self.db_path = tempfile.mkstemp()
-        
-        # 创建测试应用
+        # 创建测试应用（TestingConfig 使用内存数据库，不产生磁盘文件）
         self.app = create_app('testing')
-        self.app.config['DATABASE'] = self.db_path
         self.app.config['TESTING'] = True
         
         self.client = self.app.test_client()
@@ -34,8 +33,11 @@ class TodoTestCase(unittest.TestCase):
     
     def tearDown(self):
         """测试后清理"""
-        os.close(self.db_fd)
-        os.unlink(self.db_path)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        # 服务层缓存按进程保留，下一个测试使用新的数据库
+        clear_caches()
     
     def test_home_page(self):
         """测试主页"""
@@ -98,6 +100,52 @@ class TodoTestCase(unittest.TestCase):
             deleted_todo = TodoService.get_todo_by_id(todo.id)
             self.assertIsNone(deleted_todo)
     
+    def test_bulk_update_and_delete(self):
+        """测试批量更新和批量删除"""
+        with self.app.app_context():
+            ids = [todo.id for todo in TodoService.bulk_create(
+                [{'content': f'批量任务{i}', 'priority': 'low'} for i in range(3)])]
+            
+            todos = TodoService.bulk_update(ids, {'priority': 'high'})
+            self.assertEqual(sorted(t.id for t in todos), sorted(ids))
+            self.assertTrue(all(t.priority == 'high' for t in todos))
+            
+            # 包含不存在的任务时整体回滚
+            with self.assertRaises(ValueError):
+                TodoService.bulk_update(ids + [999999], {'priority': 'low'})
+            self.assertEqual(Todo.query.filter(Todo.id.in_(ids), Todo.priority == 'low').count(), 0)
+            
+            self.assertTrue(TodoService.bulk_delete(ids))
+            self.assertEqual(Todo.query.filter(Todo.id.in_(ids)).count(), 0)
+    
+    def test_transaction(self):
+        """测试多个服务调用合并为一个事务"""
+        with self.app.app_context():
+            with transaction():
+                first = TodoService.create_todo({'content': '事务任务一'})
+                TodoService.mark_completed(first.id)
+                TodoService.create_todo({'content': '事务任务二'})
+            self.assertEqual(Todo.query.count(), 2)
+            self.assertEqual(TodoService.get_stats().completed, 1)
+            
+            # 事务中任一调用失败，之前的写入一起回滚
+            with self.assertRaises(ValueError):
+                with transaction():
+                    TodoService.create_todo({'content': '事务任务三'})
+                    TodoService.create_todo({'content': ''})
+            self.assertEqual(Todo.query.count(), 2)
+    
+    def test_priority_ordering(self):
+        """测试默认按 high → medium → low 排序"""
+        with self.app.app_context():
+            ids = {TodoService.create_todo({'content': f'{p}任务', 'priority': p}).id
+                   for p in ('low', 'high', 'medium')}
+            
+            todos = [t for t in TodoService.get_all_todos() if t.id in ids]
+            self.assertEqual([t.priority for t in todos], ['high', 'medium', 'low'])
+            # 从数据库读出的优先级是驻留字符串
+            self.assertIs(todos[0].priority, sys.intern('high'))
+    
     def test_mark_completed(self):
         """测试标记任务完成"""
         with self.app.app_context():
@@ -116,9 +164,11 @@ class TodoTestCase(unittest.TestCase):
         """测试获取统计信息"""
         with self.app.app_context():
             # 创建一些任务
-            TodoService.create_todo({'content': '任务1', 'priority': 'high'})
-            TodoService.create_todo({'content': '任务2', 'priority': 'medium'})
-            TodoService.create_todo({'content': '任务3', 'priority': 'low'})
+            TodoService.bulk_create([
+                {'content': '任务1', 'priority': 'high'},
+                {'content': '任务2', 'priority': 'medium'},
+                {'content': '任务3', 'priority': 'low'}
+            ])
             
             # 标记一个任务完成
             todos = TodoService.get_all_todos()
@@ -126,10 +176,10 @@ class TodoTestCase(unittest.TestCase):
             
             # 获取统计信息
             stats = TodoService.get_stats()
-            self.assertEqual(stats['total'], 3)
-            self.assertEqual(stats['completed'], 1)
-            self.assertEqual(stats['pending'], 2)
-            self.assertEqual(stats['completion_rate'], 33.3)
+            self.assertEqual(stats.total, 3)
+            self.assertEqual(stats.completed, 1)
+            self.assertEqual(stats.pending, 2)
+            self.assertEqual(stats.completion_rate, 33.3)
     
     def test_api_endpoints(self):
         """测试API端点"""
@@ -157,6 +207,15 @@ class TodoTestCase(unittest.TestCase):
         self.assertIn('completed', data)
         self.assertIn('pending', data)
     
+    def test_api_todos_streaming(self):
+        """测试任务数超过一批时流式输出的JSON完整"""
+        with self.app.app_context():
+            TodoService.bulk_create([{'content': f'任务{i}'} for i in range(STREAM_BATCH_SIZE + 5)])
+        
+        response = self.client.get('/api/todos')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)), STREAM_BATCH_SIZE + 5)
+    
     def test_validation_utils(self):
         """测试验证工具"""
         # 测试任务内容验证
@@ -191,23 +250,29 @@ class TodoTestCase(unittest.TestCase):
         # 测试无效日期
         parsed = DateTimeUtils.parse_datetime('invalid-date')
         self.assertIsNone(parsed)
+        
+        # 兼容旧版本的函数接受非字符串参数
+        dt = datetime(2024, 1, 2, 3, 4, 5)
+        self.assertEqual(format_datetime(dt), '2024年01月02日 03:04')
+        self.assertIsNotNone(get_relative_time(dt))
+        self.assertEqual(format_datetime(5), 5)
+        self.assertIsNone(get_relative_time(5))
+        self.assertEqual(format_datetime('2024-01-02T03:04:05'), '2024年01月02日 03:04')
+        self.assertEqual(format_datetime('abc'), 'abc')
     
     def test_data_utils(self):
         """测试数据处理工具"""
         with self.app.app_context():
             # 创建测试数据
-            todos = []
-            for i in range(5):
-                todo = TodoService.create_todo({
-                    'content': f'任务{i}',
-                    'priority': 'medium' if i % 2 == 0 else 'high'
-                })
-                todos.append(todo)
+            todos = TodoService.bulk_create([{
+                'content': f'任务{i}',
+                'priority': 'medium' if i % 2 == 0 else 'high'
+            } for i in range(5)])
             
             # 测试统计计算
             stats = DataUtils.calculate_stats(todos)
-            self.assertEqual(stats['total'], 5)
-            self.assertEqual(stats['pending'], 5)
+            self.assertEqual(stats.total, 5)
+            self.assertEqual(stats.pending, 5)
             
             # 测试排序
             sorted_todos = DataUtils.sort_todos(todos, 'priority', 'asc')
@@ -217,6 +282,21 @@ class TodoTestCase(unittest.TestCase):
             filtered_todos = DataUtils.filter_todos(todos, {'priority': 'high'})
             self.assertLess(len(filtered_todos), 5)
     
+    def test_calculate_stats_soa(self):
+        """测试按列统计与逐个任务统计结果一致"""
+        with self.app.app_context():
+            TodoService.bulk_create([{
+                'content': f'任务{i}',
+                'priority': ('high', 'medium', 'low')[i % 3],
+                'due_date': '2000-01-01' if i % 4 == 0 else None
+            } for i in range(10)])
+            TodoService.mark_completed(1)
+            
+            rows = db.session.query(Todo.completed, Todo.priority, Todo.due_date, Todo.created_at).all()
+            stats = DataUtils.calculate_stats_soa(*DataUtils.stats_columns(rows))
+            self.assertEqual(stats, DataUtils.calculate_stats(TodoService.get_all_todos()))
+            self.assertEqual(stats.overdue, 2)
+    
     def test_category_service(self):
         """测试分类服务"""
         with self.app.app_context():
@@ -255,6 +335,36 @@ class TodoTestCase(unittest.TestCase):
             tags = TagService.get_all_tags()
             self.assertGreater(len(tags), 0)
     
+    def test_tags_json(self):
+        """测试标签编码缓存不会混淆相等但类型不同的值"""
+        self.assertEqual(json.loads(_tags_json(['工作', '学习'])), ['工作', '学习'])
+        self.assertEqual(_tags_json([1]), '[1]')
+        self.assertEqual(_tags_json([True]), '[true]')
+        self.assertIsNone(_tags_json([]))
+    
+    def test_list_with_counts(self):
+        """测试分类/标签任务数的分组统计"""
+        with self.app.app_context():
+            category = CategoryService.create_category(name='计数分类')
+            tag = TagService.create_tag(name='计数标签')
+            for content in ('任务一', '任务二'):
+                TodoService.create_todo({'content': content, 'category': '计数分类'})
+            db.session.add(TodoTag(todo_id=Todo.query.first().id, tag_id=tag.id))
+            db.session.commit()
+            
+            category_counts = {c.name: count for c, count in Category.list_with_counts()}
+            self.assertEqual(category_counts['计数分类'], 2)
+            self.assertEqual(category.to_dict(category_counts['计数分类'])['todo_count'], 2)
+            
+            tag_counts = {t.name: count for t, count in Tag.list_with_counts()}
+            self.assertEqual(tag_counts['计数标签'], 1)
+            
+            # 仍被任务使用的分类和标签不能删除
+            with self.assertRaises(ValueError):
+                CategoryService.delete_category(category.id)
+            with self.assertRaises(ValueError):
+                TagService.delete_tag(tag.id)
+    
     def test_error_handling(self):
         """测试错误处理"""
         # 测试404错误
@@ -281,10 +391,83 @@ class TodoTestCase(unittest.TestCase):
         }, follow_redirects=True)
         self.assertIn(b'Task added successfully', response.data)
 
+@unittest.skipUnless(importlib.util.find_spec('flask_caching'), '需要安装 Flask-Caching')
+class SimpleAppCacheTestCase(unittest.TestCase):
+    """app_simple.py 读缓存失效测试"""
+    
+    @classmethod
+    def setUpClass(cls):
+        # app_simple 在导入时读取数据库地址，使用临时文件，不碰开发数据库
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(cls.tmpdir.name, 'todo_simple.db')
+        import app_simple
+        cls.module = app_simple
+    
+    @classmethod
+    def tearDownClass(cls):
+        os.environ.pop('DATABASE_URL', None)
+        cls.tmpdir.cleanup()
+    
+    def setUp(self):
+        with self.module.app.app_context():
+            self.module.db.create_all()
+            self.module.cache.clear()
+        # 让线程频繁切换，读-改-写之间更容易被其他线程插入
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+    
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+        with self.module.app.app_context():
+            self.module.db.session.remove()
+            self.module.db.drop_all()
+            self.module.cache.clear()
+    
+    def test_read_after_interleaved_writes_is_fresh(self):
+        """测试并发写入与读取交错后，下一次读取能看到全部写入"""
+        app = self.module.app
+        
+        def post(content):
+            app.test_client().post('/api/todos', json={'content': content})
+        
+        def read():
+            app.test_client().get('/api/todos')
+        
+        for i in range(20):
+            threads = [threading.Thread(target=post, args=(f'任务{i}a',)),
+                       threading.Thread(target=read),
+                       threading.Thread(target=post, args=(f'任务{i}b',))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            todos = json.loads(app.test_client().get('/api/todos').data)
+            self.assertEqual(len(todos), 2 * i + 2)
+    
+    def test_version_bumps_are_not_lost(self):
+        """测试多个线程同时失效缓存时版本号不会丢失更新"""
+        module = self.module
+        
+        def bump():
+            for _ in range(200):
+                module.invalidate_todos_cache()
+        
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        with module.app.app_context():
+            self.assertEqual(module.cache.get('todos_version'), 1600)
+
 def run_tests():
     """运行测试"""
     # 创建测试套件
-    suite = unittest.TestLoader().loadTestsFromTestCase(TodoTestCase)
+    loader = unittest.TestLoader()
+    suite = loader.loadTestsFromTestCase(TodoTestCase)
+    suite.addTests(loader.loadTestsFromTestCase(SimpleAppCacheTestCase))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,14 +1,84 @@
 import json
 import re
+import time
+import calendar
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from operator import attrgetter
+from collections import Counter
+from dataclasses import dataclass
 from flask import current_app
 import logging
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+from core import parse_datetime, relative_time_from_seconds
+
+# 有 orjson 时用它解码标签JSON（比标准库快），解码错误同样是 json.JSONDecodeError 的子类
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# numpy 为可选依赖，安装后 calculate_stats_soa 使用数组归约
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# numba 为可选依赖（依赖 numpy），安装后 calculate_stats_soa 在一次编译好的循环里完成全部计数
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# calculate_stats_soa 中优先级的整数编码，numba 处理字符串很慢
+_PRIORITY_CODES = {'high': 0, 'medium': 1, 'low': 2}
+
+if njit is not None:
+    @njit(cache=True)
+    def _stats_kernel(completed, priority_codes, overdue, created_ordinals, today_ordinal):
+        """一次遍历统计 已完成/高/中/低优先级/过期/今日创建 六项数量"""
+        done = high = medium = low = late = today = 0
+        for i in range(len(completed)):
+            if completed[i]:
+                done += 1
+            code = priority_codes[i]
+            if code == 0:
+                high += 1
+            elif code == 1:
+                medium += 1
+            elif code == 2:
+                low += 1
+            if overdue[i]:
+                late += 1
+            if created_ordinals[i] == today_ordinal:
+                today += 1
+        return done, high, medium, low, late, today
+
+    # 导入时先编译一次（cache=True 会把编译结果写到磁盘供其他进程复用），避免首个请求承担编译耗时
+    _stats_kernel(np.zeros(1, np.bool_), np.zeros(1, np.int8), np.zeros(1, np.bool_),
+                  np.zeros(1, np.int32), 0)
+else:
+    _stats_kernel = None
+
+# 日志处理器和级别由应用配置，这里只取模块日志器
 logger = logging.getLogger(__name__)
 
+# parse_datetime 支持的格式
+_DATETIME_FORMATS = (
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d %H:%M',
+    '%Y/%m/%d'
+)
+
+# (字符串长度, 年份后的分隔符) -> 格式
+_DATETIME_FORMAT_BY_SHAPE = {
+    (len(datetime(2000, 1, 1).strftime(fmt)), fmt[2]): fmt for fmt in _DATETIME_FORMATS
+}
+
 class DateTimeUtils:
     """日期时间工具类"""
     
@@ -17,11 +87,8 @@ class DateTimeUtils:
         """格式化日期时间为可读格式"""
         if not dt:
             return None
-        try:
-            return dt.strftime('%Y年%m月%d日 %H:%M')
-        except Exception as e:
-            logger.error(f"格式化日期时间失败: {e}")
-            return str(dt)
+        # 等价于 strftime('%Y年%m月%d日 %H:%M')，直接拼接省去 strftime 的格式解析
+        return f"{dt.year}年{dt.month:02d}月{dt.day:02d}日 {dt.hour:02d}:{dt.minute:02d}"
     
     @staticmethod
     def get_relative_time(dt: datetime) -> str:
@@ -29,21 +96,11 @@ class DateTimeUtils:
         if not dt:
             return None
         try:
-            now = datetime.utcnow()
-            diff = now - dt
-            
-            if diff.days > 0:
-                return f"{diff.days}天前"
-            elif diff.seconds > 3600:
-                hours = diff.seconds // 3600
-                return f"{hours}小时前"
-            elif diff.seconds > 60:
-                minutes = diff.seconds // 60
-                return f"{minutes}分钟前"
-            else:
-                return "刚刚"
+            # 整数秒相减，不构造 utcnow() 和 timedelta；timegm 把无时区的时间按UTC处理
+            seconds = int(time.time()) - calendar.timegm(dt.utctimetuple())
+            return relative_time_from_seconds(seconds)
         except Exception as e:
-            logger.error(f"计算相对时间失败: {e}")
+            logger.error("计算相对时间失败: %s", e)
             return None
     
     @staticmethod
@@ -52,16 +109,25 @@ class DateTimeUtils:
         if not date_str:
             return None
         
-        formats = [
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d %H:%M',
-            '%Y-%m-%d',
-            '%Y/%m/%d %H:%M:%S',
-            '%Y/%m/%d %H:%M',
-            '%Y/%m/%d'
-        ]
+        # 补零的标准写法可由长度和分隔符直接确定格式，只解析一次
+        fmt = _DATETIME_FORMAT_BY_SHAPE.get((len(date_str), date_str[4:5]))
+        if fmt:
+            if fmt[2] == '-':
+                # YYYY-MM-DD[ HH:MM[:SS]] 先用C实现的 fromisoformat 解析（比 strptime 快得多），
+                # 按格式回写与原字符串一致才采用，fromisoformat 额外接受的写法（如带时区）仍交给 strptime
+                try:
+                    result = datetime.fromisoformat(date_str)
+                    if result.strftime(fmt) == date_str:
+                        return result
+                except ValueError:
+                    pass
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                pass
         
-        for fmt in formats:
+        # 未补零等其他写法逐个尝试
+        for fmt in _DATETIME_FORMATS:
             try:
                 return datetime.strptime(date_str, fmt)
             except ValueError:
@@ -74,32 +140,75 @@ class DateTimeUtils:
         """验证日期字符串是否有效"""
         return DateTimeUtils.parse_datetime(date_str) is not None
 
+# 校验/清理结果缓存只收录不超过该长度的输入，超长请求体不会占用缓存内存
+VALIDATION_CACHE_MAX_LEN = 1000
+
+VALID_PRIORITIES = frozenset(('low', 'medium', 'high'))
+
+# validate_priority 的结果只有四种，预先构造好，调用时不再创建字典
+_PRIORITY_RESULTS = {p: {'valid': True, 'priority': p} for p in VALID_PRIORITIES}
+_INVALID_PRIORITY_RESULT = {'valid': False, 'error': '无效的优先级值'}
+
+# 清理输入用的正则在模块加载时编译一次
+_SCRIPT_RE = re.compile(r'<script.*?</script>', re.IGNORECASE | re.DOTALL)
+# 否定字符类一次线性扫描到 '>'，不像 <.*?> 那样逐字符回溯；同时会去掉跨行的标签
+_TAG_RE = re.compile(r'<[^>]*>')
+
+def _validate_todo_content(content: str) -> Dict[str, Any]:
+    """验证任务内容"""
+    if not content or not content.strip():
+        return {'valid': False, 'error': '任务内容不能为空'}
+    
+    content = content.strip()
+    if len(content) > 500:
+        return {'valid': False, 'error': '任务内容不能超过500个字符'}
+    
+    if len(content) < 2:
+        return {'valid': False, 'error': '任务内容至少需要2个字符'}
+    
+    return {'valid': True, 'content': content}
+
+def _sanitize_input(text: str) -> str:
+    """清理用户输入"""
+    if not text:
+        return ""
+    
+    # 移除潜在的XSS攻击代码
+    text = _SCRIPT_RE.sub('', text)
+    text = _TAG_RE.sub('', text)  # 移除所有HTML标签
+    
+    # 限制长度
+    if len(text) > 1000:
+        text = text[:1000]
+    
+    return text.strip()
+
+# 纯函数，相同输入（常见的标题、备注）反复出现时直接返回缓存结果
+_validate_todo_content_cached = lru_cache(maxsize=4096)(_validate_todo_content)
+_sanitize_input_cached = lru_cache(maxsize=4096)(_sanitize_input)
+
+# validate_tags 中表示“没有不合法标签”的哨兵（标签本身可能是 None）
+_NO_TAG = object()
+
+def _is_cacheable(value) -> bool:
+    return isinstance(value, str) and len(value) <= VALIDATION_CACHE_MAX_LEN
+
 class ValidationUtils:
     """数据验证工具类"""
     
     @staticmethod
     def validate_todo_content(content: str) -> Dict[str, Any]:
-        """验证任务内容"""
-        if not content or not content.strip():
-            return {'valid': False, 'error': '任务内容不能为空'}
-        
-        content = content.strip()
-        if len(content) > 500:
-            return {'valid': False, 'error': '任务内容不能超过500个字符'}
-        
-        if len(content) < 2:
-            return {'valid': False, 'error': '任务内容至少需要2个字符'}
-        
-        return {'valid': True, 'content': content}
+        """验证任务内容（结果可能来自缓存，调用方不要修改返回的字典）"""
+        if _is_cacheable(content):
+            return _validate_todo_content_cached(content)
+        return _validate_todo_content(content)
     
     @staticmethod
     def validate_priority(priority: str) -> Dict[str, Any]:
-        """验证优先级"""
-        valid_priorities = ['low', 'medium', 'high']
-        if priority not in valid_priorities:
-            return {'valid': False, 'error': '无效的优先级值'}
-        
-        return {'valid': True, 'priority': priority}
+        """验证优先级（返回共享的结果字典，调用方不要修改）"""
+        if not isinstance(priority, str):
+            return _INVALID_PRIORITY_RESULT
+        return _PRIORITY_RESULTS.get(priority, _INVALID_PRIORITY_RESULT)
     
     @staticmethod
     def validate_tags(tags_str: str) -> Dict[str, Any]:
@@ -108,72 +217,170 @@ class ValidationUtils:
             return {'valid': True, 'tags': []}
         
         try:
-            tags = json.loads(tags_str) if isinstance(tags_str, str) else tags_str
+            tags = _json_loads(tags_str) if isinstance(tags_str, str) else tags_str
             if not isinstance(tags, list):
                 return {'valid': False, 'error': '标签格式错误'}
             
-            # 验证每个标签
-            valid_tags = []
-            for tag in tags:
-                if isinstance(tag, str) and 1 <= len(tag) <= 20:
-                    valid_tags.append(tag.strip())
-                else:
-                    return {'valid': False, 'error': f'无效的标签: {tag}'}
+            # 验证每个标签：找到第一个不合法的就返回，全部合法时一次生成结果列表
+            invalid = next((tag for tag in tags if not (isinstance(tag, str) and 1 <= len(tag) <= 20)), _NO_TAG)
+            if invalid is not _NO_TAG:
+                return {'valid': False, 'error': f'无效的标签: {invalid}'}
             
-            return {'valid': True, 'tags': valid_tags}
+            return {'valid': True, 'tags': [tag.strip() for tag in tags]}
         except json.JSONDecodeError:
             return {'valid': False, 'error': '标签JSON格式错误'}
     
     @staticmethod
     def sanitize_input(text: str) -> str:
         """清理用户输入"""
-        if not text:
-            return ""
-        
-        # 移除潜在的XSS攻击代码
-        text = re.sub(r'<script.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-        text = re.sub(r'<.*?>', '', text)  # 移除所有HTML标签
-        
-        # 限制长度
-        if len(text) > 1000:
-            text = text[:1000]
-        
-        return text.strip()
+        if _is_cacheable(text):
+            return _sanitize_input_cached(text)
+        return _sanitize_input(text)
+
+@dataclass(frozen=True, slots=True)
+class TodoStats:
+    """任务统计结果
+    
+    不可变且可哈希，可以放进缓存直接共享给多个调用方，不必防御性复制
+    """
+    total: int
+    completed: int
+    pending: int
+    completion_rate: float
+    high: int
+    medium: int
+    low: int
+    overdue: int
+    today_todos: int
+    
+    @classmethod
+    def from_counts(cls, total: int, completed: int, high: int, medium: int, low: int,
+                    overdue: int, today_todos: int) -> 'TodoStats':
+        """由各项计数构造统计结果，待完成数和完成率在这里算出"""
+        completion_rate = round((completed / total * 100) if total > 0 else 0, 1)
+        return cls(total, completed, total - completed, completion_rate,
+                   high, medium, low, overdue, today_todos)
+    
+    @property
+    def priority_stats(self) -> Dict[str, int]:
+        """按优先级统计"""
+        return {'high': self.high, 'medium': self.medium, 'low': self.low}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为API返回的字典格式"""
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'pending': self.pending,
+            'completion_rate': self.completion_rate,
+            'priority_stats': self.priority_stats,
+            'overdue': self.overdue,
+            'today_todos': self.today_todos
+        }
+
+# sort_todos 使用的排序key
+_PRIORITY_SORT_ORDER = {'high': 1, 'medium': 2, 'low': 3}
+_get_created_at = attrgetter('created_at')
+_get_completed = attrgetter('completed')
 
 class DataUtils:
     """数据处理工具类"""
     
     @staticmethod
-    def calculate_stats(todos: List) -> Dict[str, Any]:
+    def calculate_stats(todos: List) -> TodoStats:
         """计算任务统计信息"""
         total = len(todos)
-        completed = sum(1 for todo in todos if todo.completed)
-        pending = total - completed
-        completion_rate = round((completed / total * 100) if total > 0 else 0, 1)
+        # 逐个比较年月日，不必为每个任务调用 .date() 创建新对象
+        now = datetime.utcnow()
+        today_year, today_month, today_day = now.year, now.month, now.day
         
-        # 按优先级统计
-        priority_stats = {
-            'high': sum(1 for todo in todos if todo.priority == 'high'),
-            'medium': sum(1 for todo in todos if todo.priority == 'medium'),
-            'low': sum(1 for todo in todos if todo.priority == 'low')
-        }
+        # 一次遍历累加所有计数
+        completed = high = medium = low = overdue = today_todos = 0
+        for todo in todos:
+            if todo.completed:
+                completed += 1
+            
+            priority = todo.priority
+            if priority == 'high':
+                high += 1
+            elif priority == 'medium':
+                medium += 1
+            elif priority == 'low':
+                low += 1
+            
+            if getattr(todo, 'is_overdue', False):
+                overdue += 1
+            
+            created_at = todo.created_at
+            if (created_at and created_at.day == today_day
+                    and created_at.month == today_month and created_at.year == today_year):
+                today_todos += 1
         
-        # 逾期任务统计
-        overdue = sum(1 for todo in todos if hasattr(todo, 'is_overdue') and todo.is_overdue)
+        return TodoStats.from_counts(total, completed, high, medium, low, overdue, today_todos)
+    
+    @staticmethod
+    def stats_columns(rows, now: datetime = None) -> tuple:
+        """把 (completed, priority, due_date, created_at) 查询行转换为按列存放的统计输入
         
-        # 今日任务统计
-        today = datetime.utcnow().date()
-        today_todos = sum(1 for todo in todos if todo.created_at and todo.created_at.date() == today)
+        返回 (completed, priority, overdue, created_ordinals) 四个等长列表，
+        没有创建时间的任务 created_ordinal 为 0
+        """
+        if now is None:
+            now = datetime.utcnow()
+        completed, priority, overdue, created_ordinals = [], [], [], []
+        for is_completed, todo_priority, due_date, created_at in rows:
+            completed.append(bool(is_completed))
+            priority.append(todo_priority)
+            overdue.append(bool(due_date and not is_completed and now > due_date))
+            created_ordinals.append(created_at.toordinal() if created_at else 0)
+        return completed, priority, overdue, created_ordinals
+    
+    @staticmethod
+    def calculate_stats_soa(completed, priority, overdue, created_ordinals,
+                            today_ordinal: int = None) -> TodoStats:
+        """按列计算任务统计信息，结果与 calculate_stats 相同
         
-        return {
-            'total': total,
-            'completed': completed,
-            'pending': pending,
-            'completion_rate': completion_rate,
-            'priority_stats': priority_stats,
-            'overdue': overdue,
-            'today_todos': today_todos
-        }
+        各参数为等长序列，第 i 个元素属于第 i 个任务；安装了 numba 时由 _stats_kernel 一次遍历完成，
+        只安装了 numpy 时每项计数是一次数组归约
+        """
+        if today_ordinal is None:
+            today_ordinal = datetime.utcnow().toordinal()
+        total = len(completed)
+        
+        if _stats_kernel is not None:
+            priority_codes = np.fromiter((_PRIORITY_CODES.get(p, -1) for p in priority),
+                                         dtype=np.int8, count=total)
+            return TodoStats.from_counts(total, *_stats_kernel(
+                np.asarray(completed, dtype=np.bool_),
+                priority_codes,
+                np.asarray(overdue, dtype=np.bool_),
+                np.asarray(created_ordinals, dtype=np.int32),
+                today_ordinal
+            ))
+        
+        # 优先级是字符串列，用 Counter 一次遍历得到直方图，比对象数组上的三次比较更快
+        priority_counts = Counter(priority)
+        
+        if np is not None:
+            return TodoStats.from_counts(
+                total,
+                int(np.count_nonzero(completed)),
+                priority_counts['high'],
+                priority_counts['medium'],
+                priority_counts['low'],
+                int(np.count_nonzero(overdue)),
+                int(np.count_nonzero(np.asarray(created_ordinals) == today_ordinal))
+            )
+        
+        return TodoStats.from_counts(
+            total,
+            sum(map(bool, completed)),
+            priority_counts['high'],
+            priority_counts['medium'],
+            priority_counts['low'],
+            sum(map(bool, overdue)),
+            sum(1 for ordinal in created_ordinals if ordinal == today_ordinal)
+        )
     
     @staticmethod
     def sort_todos(todos: List, sort_by: str = 'priority', order: str = 'asc') -> List:
@@ -181,51 +388,65 @@ class DataUtils:
         reverse = order.lower() == 'desc'
         
         if sort_by == 'priority':
-            priority_order = {'high': 1, 'medium': 2, 'low': 3}
-            return sorted(todos, key=lambda x: priority_order.get(x.priority, 2), reverse=reverse)
+            rank = _PRIORITY_SORT_ORDER.get
+            return sorted(todos, key=lambda x: rank(x.priority, 2), reverse=reverse)
         elif sort_by == 'created_at':
-            return sorted(todos, key=lambda x: x.created_at or datetime.min, reverse=reverse)
+            # created_at 有默认值，一般不为空：先用C实现的 attrgetter，遇到空值无法比较时再换成带默认值的key
+            try:
+                return sorted(todos, key=_get_created_at, reverse=reverse)
+            except TypeError:
+                return sorted(todos, key=lambda x: x.created_at or datetime.min, reverse=reverse)
         elif sort_by == 'due_date':
             return sorted(todos, key=lambda x: x.due_date or datetime.max, reverse=reverse)
         elif sort_by == 'completed':
-            return sorted(todos, key=lambda x: x.completed, reverse=reverse)
+            return sorted(todos, key=_get_completed, reverse=reverse)
         else:
             return todos
     
+    @staticmethod
+    def _has_all_tags(todo_tags, required) -> bool:
+        """任务标签是否包含 required 中的每一个标签"""
+        return all(tag in todo_tags for tag in required)
+    
     @staticmethod
     def filter_todos(todos: List, filters: Dict[str, Any]) -> List:
-        """过滤任务列表"""
-        filtered_todos = todos
+        """过滤任务列表（先收集生效的条件，再一次遍历完成过滤）"""
+        predicates = []
         
         # 按完成状态过滤
         if 'completed' in filters:
-            filtered_todos = [t for t in filtered_todos if t.completed == filters['completed']]
+            completed = filters['completed']
+            predicates.append(lambda t: t.completed == completed)
         
         # 按优先级过滤
         if 'priority' in filters:
-            filtered_todos = [t for t in filtered_todos if t.priority == filters['priority']]
+            priority = filters['priority']
+            predicates.append(lambda t: t.priority == priority)
         
         # 按分类过滤
         if 'category' in filters:
-            filtered_todos = [t for t in filtered_todos if t.category == filters['category']]
+            category = filters['category']
+            predicates.append(lambda t: t.category == category)
         
-        # 按标签过滤
-        if 'tags' in filters:
-            for tag in filters['tags']:
-                filtered_todos = [t for t in filtered_todos if t.tags and tag in json.loads(t.tags)]
+        # 按标签过滤（每个任务的标签只解码一次）
+        if 'tags' in filters and filters['tags']:
+            required = filters['tags']
+            predicates.append(lambda t: bool(t.tags) and DataUtils._has_all_tags(_json_loads(t.tags), required))
         
-        # 按日期范围过滤
+        # 按日期范围过滤（日期只解析一次）
         if 'date_from' in filters:
             date_from = DateTimeUtils.parse_datetime(filters['date_from'])
             if date_from:
-                filtered_todos = [t for t in filtered_todos if t.created_at and t.created_at >= date_from]
+                predicates.append(lambda t: t.created_at and t.created_at >= date_from)
         
         if 'date_to' in filters:
             date_to = DateTimeUtils.parse_datetime(filters['date_to'])
             if date_to:
-                filtered_todos = [t for t in filtered_todos if t.created_at and t.created_at <= date_to]
+                predicates.append(lambda t: t.created_at and t.created_at <= date_to)
         
-        return filtered_todos
+        if not predicates:
+            return todos
+        return [t for t in todos if all(predicate(t) for predicate in predicates)]
 
 class ErrorHandler:
     """错误处理工具类"""
@@ -233,28 +454,43 @@ class ErrorHandler:
     @staticmethod
     def handle_database_error(e: Exception) -> str:
         """处理数据库错误"""
-        logger.error(f"数据库错误: {e}")
+        logger.error("数据库错误: %s", e, exc_info=True)
         return "数据库操作失败，请稍后重试"
     
     @staticmethod
     def handle_validation_error(e: Exception) -> str:
         """处理验证错误"""
-        logger.error(f"验证错误: {e}")
+        logger.error("验证错误: %s", e, exc_info=True)
         return "数据验证失败，请检查输入"
     
     @staticmethod
     def handle_general_error(e: Exception) -> str:
         """处理一般错误"""
-        logger.error(f"一般错误: {e}")
+        logger.error("一般错误: %s", e, exc_info=True)
         return "操作失败，请稍后重试"
 
+def _build_cache_key(prefix: str, *args) -> str:
+    return f"{prefix}:{':'.join(map(str, args))}"
+
+# typed=True：1 和 True 哈希相同，但生成的键分别是 "1" 和 "True"，必须区分类型
+_cache_key = lru_cache(maxsize=4096, typed=True)(_build_cache_key)
+
 class CacheUtils:
     """缓存工具类"""
     
     @staticmethod
     def get_cache_key(prefix: str, *args) -> str:
-        """生成缓存键"""
-        return f"{prefix}:{':'.join(str(arg) for arg in args)}"
+        """生成缓存键（相同参数重复出现时直接返回缓存的字符串）"""
+        try:
+            return _cache_key(prefix, *args)
+        except TypeError:
+            # 参数不可哈希，直接拼接
+            return _build_cache_key(prefix, *args)
+    
+    @staticmethod
+    def get_cache_key_1(prefix: str, arg) -> str:
+        """只有一个参数时生成缓存键，直接格式化，不经过 join"""
+        return f"{prefix}:{arg}"
     
     @staticmethod
     def cache_result(func):
@@ -270,20 +506,28 @@ def format_datetime(datetime_str):
     """格式化时间字符串为可读格式（兼容旧版本）"""
     if not datetime_str:
         return None
+    # 旧版本对非字符串参数原样返回，datetime 对象直接格式化
+    if not isinstance(datetime_str, str):
+        return DateTimeUtils.format_datetime(datetime_str) if isinstance(datetime_str, datetime) else datetime_str
+    # ISO时间以四位年份开头，明显不是时间的字符串直接返回，不进入异常路径
+    if not datetime_str[:4].isdigit():
+        return datetime_str
     try:
-        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-        return DateTimeUtils.format_datetime(dt)
-    except:
+        return DateTimeUtils.format_datetime(parse_datetime(datetime_str))
+    except ValueError:
         return datetime_str
 
 def get_relative_time(datetime_str):
     """获取相对时间(如:2小时前)（兼容旧版本）"""
     if not datetime_str:
         return None
+    if not isinstance(datetime_str, str):
+        return DateTimeUtils.get_relative_time(datetime_str) if isinstance(datetime_str, datetime) else None
+    # ISO时间以四位年份开头，明显不是时间的字符串直接返回，不进入异常路径
+    if not datetime_str[:4].isdigit():
+        return None
     try:
-        dt = datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-        return DateTimeUtils.get_relative_time(dt)      
-            
-    except:
+        return DateTimeUtils.get_relative_time(parse_datetime(datetime_str))
+    except ValueError:
         return None 
 
@@ -0,0 +1,18 @@
+"""
+SQLite版本应用的WSGI入口
+
+    gunicorn --config gunicorn.conf.py wsgi:app
+    gunicorn --config gunicorn.conf.py wsgi:basic_app
+"""
+
+import app as todo_app
+import app_basic
+
+# 在主进程中建表，随后关闭建表用的连接，让每个worker在fork后各自创建连接
+todo_app.init_db()
+todo_app.pool.close_all()
+app_basic.init_db()
+app_basic.pool.close_all()
+
+app = todo_app.app
+basic_app = app_basic.app